@@ -0,0 +1,81 @@
+"""
+Import-time budget check for the `pm` entry point.
+
+Usage:
+    python benchmarks/import_time.py [--budget MS]
+
+Imports `pushmate.main` in a fresh interpreter with `-X importtime`, reports the
+slowest imports and fails if the total exceeds the budget or if any of the heavy
+dependencies that should only load when a command runs were imported eagerly.
+"""
+
+import argparse
+import subprocess
+import sys
+
+# Dependencies that must not be imported by `pm --help` or shell completion
+LAZY_MODULES = ["openai", "requests", "inquirer", "yaml", "rich.markdown"]
+
+DEFAULT_BUDGET_MS = 250
+
+
+def measure() -> tuple[int, list[tuple[int, str]], list[str]]:
+    """
+    Imports `pushmate.main` in a subprocess.
+
+    Returns:
+        A tuple of the cumulative import time of `pushmate.main` in microseconds, the (cumulative time, module)
+        pairs of every import, and the lazy modules that were imported eagerly.
+    """
+    check = (
+        "import sys, pushmate.main; "
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:") :].split("|")
+        imports.append((int(cumulative), module))
+
+    total = next(
+        cumulative
+        for cumulative, module in imports
+        if module.strip() == "pushmate.main"
+    )
+    eager = [module for module in result.stdout.strip().split(",") if module]
+    return total, imports, eager
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    total, imports, eager = measure()
+
+    print(f"pushmate.main import time: {total / 1000:.1f} ms (budget {args.budget} ms)")
+    for cumulative, module in sorted(imports, reverse=True)[: args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {module.strip()}")
+
+    failed = False
+    if eager:
+        print(f"eagerly imported: {', '.join(eager)}")
+        failed = True
+    if total / 1000 > args.budget:
+        print("import time budget exceeded")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Synthetic git repositories for benchmarking.
+"""
+
+import os
+import random
+import subprocess
+
+REMOTE_URL = "https://github.com/pushmate/benchmark.git"
+
+
+def git(path: str, *args: str):
+    subprocess.run(
+        ["git", *args],
+        cwd=path,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def write_text(path: str, lines: int, seed: int):
+    rng = random.Random(seed)
+    with open(path, "w") as file:
+        for i in range(lines):
+            file.write(f"value_{i} = compute({rng.randint(0, 10**6)})  # line {i}\n")
+
+
+def build_repo(
+    root: str,
+    files: int,
+    lines: int,
+    binary: int = 0,
+    renames: int = 0,
+    pr: bool = False,
+) -> str:
+    """
+    Builds a repository with staged changes (or, with pr=True, a pushed feature branch).
+
+    Args:
+        root (str): Directory to create the repository (and its bare remote) in.
+        files (int): # of changed text files.
+        lines (int): # of lines changed per file.
+        binary (int): # of changed binary files.
+        renames (int): # of renamed (and modified) files, out of the changed text files.
+        pr (bool): Commit the changes to a feature branch pushed to a local origin.
+
+    Returns:
+        The path of the working tree.
+    """
+    path = os.path.join(root, "repo")
+    remote = os.path.join(root, "origin.git")
+    os.makedirs(path)
+    git(root, "init", "--bare", "-b", "main", remote)
+    git(path, "init", "-b", "main")
+    git(path, "config", "user.email", "bench@pushmate.dev")
+    git(path, "config", "user.name", "bench")
+    git(path, "remote", "add", "origin", REMOTE_URL)
+    # The GitHub URL is parsed for owner and repo, while pushes go to the local remote
+    git(path, "config", f"url.{remote}.insteadOf", REMOTE_URL)
+
+    for i in range(files):
+        os.makedirs(os.path.join(path, f"pkg{i % 10}"), exist_ok=True)
+        write_text(os.path.join(path, f"pkg{i % 10}", f"module_{i}.py"), lines, i)
+    for i in range(binary):
+        with open(os.path.join(path, f"asset_{i}.bin"), "wb") as file:
+            file.write(random.Random(i).randbytes(4096) + b"\0")
+    git(path, "add", "-A")
+    git(path, "commit", "-m", "base")
+    git(path, "push", "-u", "origin", "main")
+    git(path, "remote", "set-head", "origin", "main")
+
+    if pr:
+        git(path, "checkout", "-b", "feature")
+
+    for i in range(files):
+        module = os.path.join(path, f"pkg{i % 10}", f"module_{i}.py")
+        if i < renames:
+            # Keep renamed files similar enough for git to detect the rename
+            renamed = os.path.join(path, f"pkg{i % 10}", f"renamed_{i}.py")
+            git(path, "mv", module, renamed)
+            with open(renamed, "a") as file:
+                file.write("# renamed\n")
+        else:
+            write_text(module, lines, i + files)
+    for i in range(binary):
+        with open(os.path.join(path, f"asset_{i}.bin"), "wb") as file:
+            file.write(random.Random(i + binary).randbytes(4096) + b"\0")
+    git(path, "add", "-A")
+
+    if pr:
+        git(path, "commit", "-m", "changes")
+        git(path, "push", "-u", "origin", "feature")
+
+    return path
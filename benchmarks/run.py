@@ -0,0 +1,294 @@
+"""
+End-to-end benchmark of `pm commit` and `pm pr`.
+
+Usage:
+    python benchmarks/run.py [--files N] [--lines N] [--binary N] [--renames N]
+                             [--llm-latency S] [--github-latency S] [--repeat N]
+
+Builds a synthetic repository, runs `run_commit` and `run_pr` against local stand-ins
+for the OpenAI and GitHub APIs, and reports the time spent in each stage and the peak
+Python memory of each run. Interactive prompts are answered automatically: files over
+the change limit are excluded and the first generated message is accepted.
+
+Stage times are summed per run. Speculative generation and map-reduce summaries run
+concurrently, so stages can add up to more than the total.
+"""
+
+import argparse
+import contextlib
+import functools
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.repos import build_repo
+from benchmarks.servers import GitHubHandler, OpenAIHandler, get_url, start_server
+
+# Stages reported, in pipeline order
+STAGES = [
+    "repo info",
+    "diff stat",
+    "diff collection",
+    "prompt build",
+    "llm",
+    "commit",
+    "push",
+    "api create",
+]
+
+
+class StageTimer:
+    """
+    Accumulates the wall-clock time spent in each stage of a run.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.times = {}
+
+    def add(self, stage: str, duration: float):
+        with self.lock:
+            self.times[stage] = self.times.get(stage, 0.0) + duration
+
+    def wrap(self, stage: str, function):
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+
+        return timed
+
+    def wrap_generator(self, stage: str, function):
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                yield from function(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+
+        return timed
+
+
+@contextlib.contextmanager
+def silence():
+    """
+    Redirects stdout and stderr, including output of git subprocesses, to /dev/null.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = os.dup(1), os.dup(2)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        for fd in (devnull, *saved):
+            os.close(fd)
+
+
+def instrument(timer: StageTimer, target: str):
+    """
+    Patches pushmate so every stage reports to the timer and prompts answer themselves.
+
+    Returns:
+        A function that undoes the patches.
+    """
+    import inquirer
+    import typer
+
+    from pushmate.clients import git as git_module
+    from pushmate.clients.llm_client import LLMClient
+    from pushmate.commands import commit, pr
+
+    GitClient = git_module.GitClient
+    action = "create commit" if target == "commit" else "create pull request"
+    patches = [
+        (inquirer, "prompt", lambda questions: {"action": action}),
+        (commit.Prompt, "ask", staticmethod(lambda *args, **kwargs: "N")),
+        (typer, "launch", lambda *args, **kwargs: 0),
+        (
+            GitClient,
+            "get_repo_info",
+            staticmethod(timer.wrap("repo info", GitClient.get_repo_info)),
+        ),
+        (
+            GitClient,
+            "get_diff_files",
+            timer.wrap("diff stat", GitClient.get_diff_files),
+        ),
+        (GitClient, "get_diffs", timer.wrap("diff collection", GitClient.get_diffs)),
+        (GitClient, "create_commit", timer.wrap("commit", GitClient.create_commit)),
+        (
+            GitClient,
+            "push_changes",
+            staticmethod(timer.wrap("push", GitClient.push_changes)),
+        ),
+        (commit, "compact_diff", timer.wrap("prompt build", commit.compact_diff)),
+        (
+            commit,
+            "get_commit_prompt",
+            timer.wrap("prompt build", commit.get_commit_prompt),
+        ),
+        (pr, "count_tokens", timer.wrap("prompt build", pr.count_tokens)),
+        (pr, "get_pr_prompt", timer.wrap("prompt build", pr.get_pr_prompt)),
+        (pr, "create_pr", timer.wrap("api create", pr.create_pr)),
+        (
+            LLMClient,
+            "prompt_stream",
+            timer.wrap_generator("llm", LLMClient.prompt_stream),
+        ),
+        (LLMClient, "openai_prompt", timer.wrap("llm", LLMClient.openai_prompt)),
+    ]
+
+    # Attributes inherited rather than defined on the owner are deleted again on undo
+    originals = [(owner, name, vars(owner).get(name)) for owner, name, _ in patches]
+    for owner, name, value in patches:
+        setattr(owner, name, value)
+
+    def undo():
+        for owner, name, value in originals:
+            if value is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, value)
+
+    return undo
+
+
+def run_once(
+    target: str, args: argparse.Namespace, memory: bool = False
+) -> tuple[dict[str, float], int]:
+    """
+    Runs one command against a fresh synthetic repository.
+
+    Args:
+        memory (bool): Trace Python allocations to measure peak memory. Tracing slows
+            down execution, so timed runs are made without it.
+
+    Returns:
+        A tuple of the time spent per stage (including "total") and the peak memory in
+        bytes, or 0 if memory was not traced.
+    """
+    from pushmate.clients import git as git_module
+    from pushmate.commands.commit import run_commit
+    from pushmate.commands.pr import run_pr
+    from pushmate.utils.cache import ResponseCache
+
+    with tempfile.TemporaryDirectory() as root:
+        path = build_repo(
+            root,
+            args.files,
+            args.lines,
+            args.binary,
+            args.renames,
+            pr=target == "pr",
+        )
+        ResponseCache(0).clear()
+        git_module.repo_info_cache.clear()
+
+        timer = StageTimer()
+        undo = instrument(timer, target)
+        cwd = os.getcwd()
+        os.chdir(path)
+        if memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            with silence():
+                if target == "commit":
+                    run_commit(0)
+                else:
+                    run_pr("")
+        finally:
+            timer.add("total", time.perf_counter() - start)
+            peak = 0
+            if memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            os.chdir(cwd)
+            undo()
+
+    return timer.times, peak
+
+
+def configure(args: argparse.Namespace, app_dir: str):
+    """
+    Points pushmate at an isolated config directory and the stand-in servers.
+    """
+    openai_server = start_server(
+        OpenAIHandler, args.llm_latency, chunk_latency=args.chunk_latency
+    )
+    github_server = start_server(GitHubHandler, args.github_latency)
+
+    os.environ["XDG_CONFIG_HOME"] = app_dir
+    os.environ["OPENAI_BASE_URL"] = f"{get_url(openai_server)}/v1"
+    os.environ["GITHUB_API_URL"] = get_url(github_server)
+
+    from pushmate.commands.config import Config
+
+    config = Config()
+    config.set_option("provider", "openai")
+    config.set_option("openai", "benchmark")
+    config.set_option("github_token", "benchmark")
+    config.set_option("max_changes", args.max_changes)
+
+
+def report(target: str, results: list[tuple[dict[str, float], int]], peak: int):
+    print(f"\n{target} ({len(results)} runs)")
+    print(f"  {'stage':<16}{'mean ms':>10}{'min ms':>10}{'max ms':>10}")
+    for stage in STAGES + ["total"]:
+        times = [times.get(stage, 0.0) * 1000 for times, _ in results]
+        if not any(times):
+            continue
+        print(
+            f"  {stage:<16}{statistics.mean(times):>10.1f}"
+            f"{min(times):>10.1f}{max(times):>10.1f}"
+        )
+    print(f"  {'peak memory':<16}{peak / 1024**2:>10.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--files", type=int, default=50, help="# of changed files")
+    parser.add_argument("--lines", type=int, default=100, help="lines changed per file")
+    parser.add_argument("--binary", type=int, default=2, help="# of binary files")
+    parser.add_argument("--renames", type=int, default=5, help="# of renamed files")
+    parser.add_argument("--max-changes", type=int, default=500)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--chunk-latency", type=float, default=0.0)
+    parser.add_argument("--github-latency", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--target",
+        choices=["commit", "pr", "all"],
+        default="all",
+        help="command to run",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as app_dir:
+        configure(args, app_dir)
+        targets = ["commit", "pr"] if args.target == "all" else [args.target]
+        for target in targets:
+            results = [run_once(target, args) for _ in range(args.repeat)]
+            _, peak = run_once(target, args, memory=True)
+            report(target, results, peak)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Local stand-ins for the OpenAI and GitHub APIs with configurable injected latency.
+"""
+
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPLETION = (
+    "Title: Update generated files\n"
+    "Refresh the synthetic files used for benchmarking.\n\n"
+    "### Key Changes:\n- Update files\n\n### Further Improvements:\n- None"
+)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Seconds to wait before responding, set per server
+    latency = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def send_json(self, status: int, data: dict):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class OpenAIHandler(StandInHandler):
+    """
+    Serves `/v1/chat/completions`, streamed or not, with `latency` as time to first token.
+    """
+
+    # Seconds between streamed chunks
+    chunk_latency = 0.0
+
+    def do_POST(self):
+        request = self.read_json()
+        time.sleep(self.latency)
+        prompt_tokens = sum(
+            len(message["content"]) // 4 for message in request["messages"]
+        )
+
+        if not request.get("stream"):
+            choices = [
+                {
+                    "index": i,
+                    "message": {"role": "assistant", "content": COMPLETION},
+                    "finish_reason": "stop",
+                }
+                for i in range(request.get("n", 1))
+            ]
+            self.send_json(
+                200,
+                {
+                    "id": "chatcmpl-bench",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request["model"],
+                    "choices": choices,
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": len(COMPLETION) // 4,
+                        "total_tokens": prompt_tokens + len(COMPLETION) // 4,
+                    },
+                },
+            )
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for word in COMPLETION.split(" "):
+            self.write_event(
+                {
+                    "id": "chatcmpl-bench",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": request["model"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "delta": {"content": word + " "},
+                            "finish_reason": None,
+                        }
+                    ],
+                }
+            )
+            time.sleep(self.chunk_latency)
+        self.write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_event(self, data: dict):
+        self.write_chunk(f"data: {json.dumps(data)}\n\n".encode())
+
+    def write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+class GitHubHandler(StandInHandler):
+    """
+    Serves pull request and issue creation under `/repos/{owner}/{repo}/`.
+    """
+
+    counter = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        self.read_json()
+        time.sleep(self.latency)
+        with GitHubHandler.lock:
+            GitHubHandler.counter += 1
+            number = GitHubHandler.counter
+
+        kind = "pull" if self.path.endswith("/pulls") else "issues"
+        owner_repo = "/".join(self.path.split("/")[2:4])
+        self.send_json(
+            201,
+            {
+                "number": number,
+                "html_url": f"https://github.com/{owner_repo}/{kind}/{number}",
+            },
+        )
+
+
+def start_server(handler: type, latency: float, **attributes) -> ThreadingHTTPServer:
+    """
+    Starts a stand-in server on a free local port in a background thread.
+
+    Args:
+        handler (type): The request handler class.
+        latency (float): Seconds to wait before responding to each request.
+    """
+    handler = type(handler.__name__, (handler,), {"latency": latency, **attributes})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def get_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
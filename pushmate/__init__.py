@@ -0,0 +1,4 @@
+import time
+
+# When the process started running PushMate, the origin of `pm --profile` timings
+START_TIME = time.perf_counter()
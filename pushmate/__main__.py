@@ -0,0 +1,4 @@
+from pushmate.main import app
+
+# Runs in-process, never through the daemon, e.g. for the git hooks
+app(prog_name="pm")
@@ -1,33 +1,472 @@
+import atexit
+import json
+import os
 import re
+import shutil
 import subprocess
+import tempfile
+import threading
 
 from enum import Enum
 
-from pushmate.commands.config import Config
-from pushmate.utils.messages import print_error, print_success
+from pushmate.commands.config import APP_DIR, Config
+from pushmate.utils.diff import DiffFile, DiffIndex
+from pushmate.utils.ignore import (
+    exclude_pathspecs,
+    get_ignore_patterns,
+    include_pathspecs,
+)
+from pushmate.utils.messages import print_error, print_info, print_success
+from pushmate.utils.profile import span
+
+REPO_CACHE_PATH = os.path.join(APP_DIR, "repos.json")
 
 
 class GitTarget(Enum):
     COMMIT = "commit"
     PR = "pr"
+    # Commits added to a pull request since its description was generated
+    PR_UPDATE = "pr_update"
 
 
 class RepoInfo:
+    remote_url: str
     owner_name: str
     repo_name: str
     current_branch: str
     default_branch: str
 
 
+# Repository information memoized per working directory for the current process
+repo_info_cache: dict[str, RepoInfo] = {}
+
+
+def read_repo_cache() -> dict:
+    """
+    Reads the on-disk repository cache, keyed by remote URL.
+    """
+    try:
+        with open(REPO_CACHE_PATH, "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_repo_cache(repo_cache: dict):
+    """
+    Writes the on-disk repository cache.
+    """
+    os.makedirs(os.path.dirname(REPO_CACHE_PATH), exist_ok=True)
+    with open(REPO_CACHE_PATH, "w") as file:
+        json.dump(repo_cache, file)
+
+
+class GitBackend:
+    """
+    Answers git queries for one repository without spawning git for each of them.
+
+    HEAD, refs and the repository config are read directly from the git directory,
+    and other revisions are resolved by a long-lived `git cat-file --batch-check`
+    process. Whatever the in-process reader does not support (linked worktrees,
+    reftable refs, config includes) falls back to running git.
+    """
+
+    path: str
+    git_dir: str
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path (str): The working tree of the repository. Defaults to the current directory.
+        """
+        self.path = path
+        self.git_dir = find_git_dir(path)
+        self.config = None
+        self.process: subprocess.Popen = None
+        self.lock = threading.Lock()
+
+    def run(self, *args: str, env: dict = None) -> subprocess.CompletedProcess:
+        """
+        Runs a git command as a subprocess, the fallback for every query.
+
+        Args:
+            env (dict): Variables to set for the command on top of the current environment.
+        """
+        with span(f"git {args[0]}", "git"):
+            return subprocess.run(
+                ["git", *args],
+                capture_output=True,
+                text=True,
+                cwd=self.path,
+                env={**os.environ, **env} if env else None,
+            )
+
+    def get_index_path(self) -> str:
+        """
+        Gets the absolute path of the index file, honoring GIT_INDEX_FILE.
+        """
+        index = os.environ.get("GIT_INDEX_FILE")
+        if not index and self.git_dir:
+            index = os.path.join(self.git_dir, "index")
+        if not index:
+            result = self.run("rev-parse", "--git-path", "index")
+            if result.returncode != 0:
+                return None
+            index = result.stdout.strip()
+        return os.path.abspath(os.path.join(self.path or os.getcwd(), index))
+
+    def get_config(self, key: str) -> str:
+        """
+        Gets a repository config value, e.g. "remote.origin.url".
+
+        Returns:
+            The value, or an empty string if it is not set.
+        """
+        config = self.read_config()
+        if config is not None:
+            section, _, name = key.rpartition(".")
+            section, _, subsection = section.partition(".")
+            value = config.get((section.lower(), subsection, name.lower()))
+            if value is not None:
+                return value
+
+        # Not set in the repository config, or the config could not be parsed
+        return self.run("config", "--get", key).stdout.strip()
+
+    def get_head_branch(self) -> str:
+        """
+        Gets the current branch name, or "HEAD" when detached.
+        """
+        head = self.read_ref("HEAD")
+        if head is None:
+            return self.run("rev-parse", "--abbrev-ref", "HEAD").stdout.strip()
+        if head.startswith("ref: refs/heads/"):
+            return head.removeprefix("ref: refs/heads/")
+        return "HEAD"
+
+    def get_toplevel(self) -> str:
+        """
+        Gets the root of the working tree, or None if not in a git repository.
+        """
+        if self.git_dir:
+            return os.path.dirname(self.git_dir)
+        result = self.run("rev-parse", "--show-toplevel")
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    def get_symbolic_ref(self, ref: str) -> str:
+        """
+        Gets the full name of the ref a symbolic ref points to, e.g. "refs/remotes/origin/main".
+
+        Returns:
+            The target ref, or None if the ref is not a symbolic ref.
+        """
+        target = self.read_ref(ref)
+        if target is None:
+            result = self.run("symbolic-ref", "-q", ref)
+            return result.stdout.strip() if result.returncode == 0 else None
+        if target.startswith("ref: "):
+            return target.removeprefix("ref: ")
+        return None
+
+    def resolve(self, rev: str) -> str:
+        """
+        Resolves a revision, e.g. "origin/main", to an object name.
+
+        Returns:
+            The object name, or None if the revision does not exist.
+        """
+        if rev == "HEAD" or rev.startswith("refs/"):
+            name = self.read_object_name(rev)
+            if name is not None:
+                return name or None
+
+        result = self.query(rev)
+        if result is not None:
+            return result[0]
+
+        result = self.run("rev-parse", "--verify", "--quiet", rev)
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    def query(self, rev: str) -> tuple[str, str]:
+        """
+        Looks up an object with the long-lived `git cat-file --batch-check` process,
+        starting it on first use.
+
+        Returns:
+            A tuple of the object name and type, a tuple of None if the object does not
+            exist, or None if the process is unavailable.
+        """
+        if "\n" in rev:
+            return None
+
+        with self.lock, span("git cat-file --batch-check", "git"):
+            try:
+                if self.process is None or self.process.poll() is not None:
+                    self.process = subprocess.Popen(
+                        ["git", "cat-file", "--batch-check"],
+                        stdin=subprocess.PIPE,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.DEVNULL,
+                        cwd=self.path,
+                    )
+
+                self.process.stdin.write(rev.encode() + b"\n")
+                self.process.stdin.flush()
+                header = self.process.stdout.readline().split()
+                if not header:
+                    raise OSError("git cat-file exited")
+                if len(header) != 3:
+                    # "<rev> missing" or "<rev> ambiguous"
+                    return None, None
+
+                name, object_type, _ = header
+                return name.decode(), object_type.decode()
+            except (OSError, ValueError):
+                self.stop()
+                return None
+
+    def read_config(self) -> dict[tuple[str, str, str], str]:
+        """
+        Parses the repository config, keyed by (section, subsection, name).
+
+        Returns:
+            The config, or None if it uses syntax only git itself should interpret.
+        """
+        if self.config is None and self.git_dir:
+            self.config = parse_git_config(os.path.join(self.git_dir, "config"))
+        return self.config or None
+
+    def read_ref(self, ref: str) -> str:
+        """
+        Reads a loose ref file, e.g. "ref: refs/heads/main" for HEAD.
+
+        Returns:
+            The content of the ref file, an empty string if there is no such file, or
+            None if refs cannot be read in-process.
+        """
+        config = self.read_config()
+        if (
+            config is None
+            or config.get(("extensions", "", "refstorage"), "files") != "files"
+        ):
+            return None
+        try:
+            with open(os.path.join(self.git_dir, ref), "r") as file:
+                return file.read().strip()
+        except FileNotFoundError:
+            return ""
+        except OSError:
+            return None
+
+    def read_packed_ref(self, ref: str) -> str:
+        """
+        Looks up a ref in the `packed-refs` file, e.g. "refs/heads/main".
+
+        Returns:
+            The object name, an empty string if the ref is not packed, or None if the
+            file cannot be read.
+        """
+        try:
+            with open(os.path.join(self.git_dir, "packed-refs"), "r") as file:
+                for line in file:
+                    # Skip the header and the peeled objects of annotated tags
+                    if line.startswith(("#", "^")):
+                        continue
+                    name, _, packed_ref = line.strip().partition(" ")
+                    if packed_ref == ref:
+                        return name
+        except FileNotFoundError:
+            return ""
+        except OSError:
+            return None
+        return ""
+
+    def read_object_name(self, ref: str) -> str:
+        """
+        Resolves a full ref name, e.g. "HEAD" or "refs/heads/main", to an object name,
+        following symbolic refs to loose refs or `packed-refs`.
+
+        Returns:
+            The object name, an empty string if the ref does not exist (e.g. an unborn
+            branch), or None if refs cannot be read in-process.
+        """
+        # Symbolic refs can point to other symbolic refs, but not indefinitely
+        for _ in range(5):
+            if ".." in ref.split("/"):
+                return None
+            content = self.read_ref(ref)
+            if content is None:
+                return None
+            if content.startswith("ref: "):
+                ref = content.removeprefix("ref: ")
+                continue
+            if not content:
+                content = self.read_packed_ref(ref)
+            if content and not re.fullmatch(r"[0-9a-f]{40}|[0-9a-f]{64}", content):
+                return None
+            return content
+        return None
+
+    def stop(self):
+        process, self.process = self.process, None
+        if process is not None:
+            process.kill()
+            process.wait()
+
+    def close(self):
+        """
+        Stops the long-lived git process.
+        """
+        with self.lock:
+            self.stop()
+
+
+# Git backends of the repositories used by the current process, keyed by working tree
+backends: dict[str, GitBackend] = {}
+backends_lock = threading.Lock()
+
+
+def get_backend(path: str = None) -> GitBackend:
+    """
+    Gets the git backend of a repository, creating it on first use.
+
+    Args:
+        path (str): The working tree of the repository. Defaults to the current directory.
+    """
+    key = os.path.abspath(path or os.getcwd())
+    with backends_lock:
+        if key not in backends:
+            backends[key] = GitBackend(path)
+        return backends[key]
+
+
+def reset_repo_state():
+    """
+    Forgets the repository information and config read by this process, so a
+    long-lived process picks up switched branches and config edits. The
+    `git cat-file --batch-check` processes of the backends are kept.
+    """
+    repo_info_cache.clear()
+    with backends_lock:
+        for backend in backends.values():
+            backend.config = None
+
+
+@atexit.register
+def close_backends():
+    for backend in list(backends.values()):
+        backend.close()
+
+
+def find_git_dir(path: str = None) -> str:
+    """
+    Finds the git directory of the repository containing a path.
+
+    Returns:
+        The git directory, or None if it is not a plain `.git` directory (e.g. in a
+        linked worktree or when GIT_DIR is set), in which case git itself is queried.
+    """
+    if "GIT_DIR" in os.environ:
+        return None
+
+    directory = os.path.abspath(path or os.getcwd())
+    while True:
+        git_dir = os.path.join(directory, ".git")
+        if os.path.isdir(git_dir):
+            return git_dir
+        if os.path.exists(git_dir):
+            return None
+
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def parse_git_config(path: str) -> dict[tuple[str, str, str], str]:
+    """
+    Parses the subset of the git config format used by typical repository configs.
+
+    Returns:
+        The values keyed by (section, subsection, name), or an empty dict if the file
+        cannot be read or uses includes, quoting or escapes.
+    """
+    config = {}
+    section = subsection = ""
+    try:
+        with open(path, "r") as file:
+            lines = file.readlines()
+    except OSError:
+        return {}
+
+    for line in lines:
+        line = line.strip()
+        if not line or line[0] in "#;":
+            continue
+
+        header = re.match(r'^\[([\w.-]+)(?:\s+"((?:[^"\\]|\\.)*)")?\]$', line)
+        if header:
+            section = header.group(1).lower()
+            subsection = header.group(2) or ""
+            if "." in section:
+                # Deprecated [section.subsection] syntax
+                section, _, subsection = section.partition(".")
+            if section in ("include", "includeif"):
+                return {}
+            continue
+
+        entry = re.match(r"^([A-Za-z][\w-]*)\s*(?:=\s*(.*))?$", line)
+        if not entry:
+            return {}
+
+        # A key without a value is a boolean true
+        value = entry.group(2) if entry.group(2) is not None else "true"
+        if '"' in value or "\\" in value:
+            # Quoting and escapes are left to git
+            return {}
+        # Comments start at any unquoted "#" or ";", even without whitespace before
+        value = re.sub(r"[#;].*$", "", value).strip()
+        config[(section, subsection, entry.group(1).lower())] = value
+
+    return config
+
+
 class GitClient:
     target: GitTarget
     repo_info: RepoInfo
     valid_files: list[str]
+    ignored_files: list[str]
+    diff_index: DiffIndex
 
-    def __init__(self, target: GitTarget):
+    def __init__(
+        self,
+        target: GitTarget,
+        refresh: bool = False,
+        path: str = None,
+        quiet: bool = False,
+    ):
+        """
+        Args:
+            target (GitTarget): Whether changes are diffed for a commit, a pull request or
+                an update of a pull request.
+            refresh (bool): Refresh cached repository information from the remote.
+            path (str): The working tree to run git in. Defaults to the current directory.
+            quiet (bool): Record errors in `error` instead of printing them.
+        """
         self.target = target
-        self.repo_info = GitClient.get_repo_info()
+        self.path = path
+        self.quiet = quiet
+        self.error = None
+        self.backend = get_backend(path)
+        # Repository information is only needed to diff against the remote
+        self.repo_info = (
+            GitClient.get_repo_info(refresh, path)
+            if target != GitTarget.COMMIT
+            else None
+        )
         self.valid_files = []
+        self.ignored_files = []
+        self.diff_index = DiffIndex()
 
     def create_commit(self, message: str) -> bool:
         """
@@ -37,120 +476,269 @@ class GitClient:
             message (str): The commit message.
         """
         try:
-            subprocess.run(["git", "commit", "-m", message])
+            with span("git commit", "git"):
+                subprocess.run(["git", "commit", "-m", message], cwd=self.path)
             return True
         except Exception as e:
             return False
 
-    def get_diff_files(self, branch: str = "") -> list[str]:
+    def get_index_tree(self) -> str:
+        """
+        Writes the index as a tree object and gets its name, which identifies the staged
+        changes exactly.
+
+        The tree is written from a copy of the index with hooks disabled. Writing the
+        index itself would take its lock, failing git commands run at the same time,
+        and fire the `post-index-change` hook again.
+
+        Returns:
+            The tree object name, or None if the index cannot be written, e.g. while
+            there are unresolved conflicts.
+        """
+        index_path = self.backend.get_index_path()
+        if not index_path:
+            return None
+
+        with tempfile.TemporaryDirectory() as directory:
+            copy = os.path.join(directory, "index")
+            try:
+                shutil.copyfile(index_path, copy)
+            except OSError:
+                return None
+            result = self.backend.run(
+                "write-tree",
+                env={
+                    "GIT_INDEX_FILE": copy,
+                    "GIT_CONFIG_COUNT": "1",
+                    "GIT_CONFIG_KEY_0": "core.hooksPath",
+                    "GIT_CONFIG_VALUE_0": os.devnull,
+                },
+            )
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip()
+
+    def get_diff_files(self, branch: str = "") -> list[DiffFile]:
         """
-        Retrieves the statistics of the changes made to the staged files in the git repository.
+        Indexes the changes made to the staged files in the git repository.
+
+        The numstat records and the patch are collected with a single `git diff` invocation
+        into a `DiffIndex`, which is then used by `get_diffs` without spawning git again.
+        Binary files and files over the change limit are indexed without loading their patch.
+        Files matching the ignore patterns (`.pushmateignore` and the `ignore` option) are
+        excluded with pathspecs, so they are never diffed and only listed by name.
 
         Returns:
-            A list of filenames of the staged files that have changes within the specified limit.
+            A list of the changed files that are binary or exceed the change limit.
             Returns None if there are no changes staged to commit or if an error occurs.
         """
         try:
-            if self.target == GitTarget.COMMIT:
-                diff_stat = subprocess.run(
-                    ["git", "diff", "--cached", "--stat"],
-                    capture_output=True,
-                    text=True,
-                )
-            elif self.target == GitTarget.PR:
-                if not branch:
-                    branch = self.repo_info.default_branch
-                diff_stat = subprocess.run(
-                    ["git", "diff", f"origin/{branch}", "HEAD", "--stat"],
-                    capture_output=True,
-                    text=True,
+            config = Config()
+            max_changes = int(config.get_option("max_changes"))
+            toplevel = self.backend.get_toplevel()
+            patterns = (
+                get_ignore_patterns(toplevel, config.get_option("ignore"))
+                if toplevel
+                else []
+            )
+            with span("git diff", "git"):
+                diff = subprocess.Popen(
+                    self.get_diff_command(branch)
+                    + ["--"]
+                    + exclude_pathspecs(patterns),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    cwd=self.path,
                 )
+                self.diff_index = DiffIndex.from_stream(diff.stdout, max_changes)
+                stderr = diff.stderr.read().decode(errors="replace")
+                returncode = diff.wait()
 
-            if "error: unknown option `cached'" in diff_stat.stderr:
-                print_error("not in a git repository")
+            if "error: unknown option `cached'" in stderr:
+                self.print_error("not in a git repository")
                 return None
 
-            if diff_stat.returncode == 0:
-                diff_output = diff_stat.stdout
+            if returncode != 0:
+                if self.target == GitTarget.PR:
+                    base = f"origin/{branch or self.repo_info.default_branch}"
+                    if not self.backend.resolve(base):
+                        self.print_error(f"could not find branch {base}")
+                elif self.target == GitTarget.PR_UPDATE:
+                    self.print_error(f"could not find commit {branch}")
+                return None
 
-                # Empty diff output means no changes staged to commit
-                if not diff_output:
-                    if self.target == GitTarget.COMMIT:
-                        print_error("no changes staged to commit")
-                    else:
-                        print_error("no committed changes to merge")
+            # Ignored files are listed by name only, never diffed
+            if patterns:
+                self.ignored_files = self.get_changed_paths(
+                    branch, include_pathspecs(patterns)
+                )
+
+            # Empty diff output means no changes staged to commit
+            if not self.diff_index:
+                if self.ignored_files:
+                    self.print_error(
+                        f"only ignored files changed: {', '.join(self.ignored_files)}"
+                    )
                     return None
-            else:
+                if self.target == GitTarget.COMMIT:
+                    self.print_error("no changes staged to commit")
+                elif self.target == GitTarget.PR_UPDATE:
+                    self.print_error("no changes since the description was generated")
+                else:
+                    self.print_error("no committed changes to merge")
                 return None
 
             invalid_files = []
-            max_changes = int(Config().get_option("max_changes"))
-
-            # Parse diff output to get filenames and changes
-            for line in diff_output.splitlines():
-                parts = line.split("|")
-                if len(parts) == 2:
-                    filename = parts[0].strip()
-                    changes = parts[1].strip().split()[0]
-                    if changes.isdigit() and int(changes) <= max_changes:
-                        self.valid_files.append(filename)
-                    else:
-                        invalid_files.append((filename, changes))
+            for file in self.diff_index:
+                if file.loaded:
+                    self.valid_files.append(file.path)
+                else:
+                    invalid_files.append(file)
 
             if self.valid_files:
-                print_success("changed files retrieved")
+                if not self.quiet:
+                    print_success("changed files retrieved")
+                    if self.ignored_files:
+                        print_info(
+                            f"skipped {len(self.ignored_files)} ignored files: "
+                            f"{', '.join(self.ignored_files)}"
+                        )
             else:
-                print_error("could not find any changed files")
+                self.print_error("could not find any changed files")
 
             return invalid_files
 
         except Exception as e:
             if "No such file or directory: 'git'" in str(e):
-                print_error("git is not installed")
+                self.print_error("git is not installed")
             else:
-                print_error()
+                self.print_error()
             return None
 
     def get_diffs(self, branch: str = "") -> str:
-        diff_output = ""
-        for file in self.valid_files:
-            if self.target == GitTarget.COMMIT:
-                diff = subprocess.run(
-                    ["git", "diff", "--cached", file],
-                    capture_output=True,
-                    text=True,
-                )
-            elif self.target == GitTarget.PR:
-                if not branch:
-                    branch = self.repo_info.default_branch
-                diff = subprocess.run(
-                    ["git", "diff", f"origin/{branch}", "HEAD", "--", file],
-                    capture_output=True,
-                    text=True,
+        """
+        Retrieves the diffs of the valid files indexed by `get_diff_files`.
+
+        Files whose patch was skipped while indexing (e.g. files over the change limit that
+        were included afterwards) are loaded with one additional `git diff` invocation.
+
+        Returns:
+            The concatenated diffs of the valid files.
+        """
+        missing = [
+            file for file in self.valid_files if not self.diff_index.get(file).loaded
+        ]
+        if missing:
+            with span("git diff (included files)", "git", files=len(missing)):
+                diff = subprocess.Popen(
+                    self.get_diff_command(branch)
+                    + ["--"]
+                    + self.diff_index.pathspecs(missing),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    cwd=self.path,
                 )
-            diff_output += diff.stdout
+                self.diff_index.merge(DiffIndex.from_stream(diff.stdout))
+                diff.wait()
+
+        return self.diff_index.get_diffs(self.valid_files)
+
+    def get_commit_subjects(self, base: str) -> list[str]:
+        """
+        Lists the subjects of the commits after a base commit, oldest first.
+        """
+        result = self.backend.run("log", "--reverse", "--format=%s", f"{base}..HEAD")
+        if result.returncode != 0:
+            return []
+        return result.stdout.splitlines()
+
+    def is_ancestor(self, commit: str) -> bool:
+        """
+        Checks whether a commit is part of the history of HEAD, e.g. was not rewritten
+        by a rebase.
+        """
+        result = self.backend.run("merge-base", "--is-ancestor", commit, "HEAD")
+        return result.returncode == 0
+
+    def get_changed_paths(self, branch: str, pathspecs: list[str]) -> list[str]:
+        """
+        Lists the changed files matching the given pathspecs, without diffing them.
+        """
+        command = self.get_diff_command(branch, ["-z", "--name-only"])
+        result = self.backend.run(*command[1:], "--", *pathspecs)
+        if result.returncode != 0:
+            return []
+        return [path for path in result.stdout.split("\0") if path]
+
+    def print_error(self, message: str = "an unexpected error occurred"):
+        """
+        Records an error, printing it unless the client is quiet.
+        """
+        self.error = message
+        if not self.quiet:
+            print_error(message)
+
+    def get_diff_command(
+        self, branch: str = "", options: list[str] = None
+    ) -> list[str]:
+        """
+        Builds the git diff command for the current target.
+
+        Args:
+            branch (str): The branch to diff against for pull requests, or the commit
+                to diff against for pull request updates.
+            options (list[str]): The output options. Defaults to the numstat records and
+                the patch, as parsed by `DiffIndex`.
+        """
+        if options is None:
+            # Patch headers are parsed by `DiffIndex`, whatever the user's diff config
+            options = [
+                "-z",
+                "--numstat",
+                "--patch",
+                "--no-color",
+                "--no-ext-diff",
+                "--src-prefix=a/",
+                "--dst-prefix=b/",
+            ]
+        if self.target == GitTarget.COMMIT:
+            return ["git", "diff", "--cached"] + options
+        if self.target == GitTarget.PR_UPDATE:
+            return ["git", "diff", branch, "HEAD"] + options
 
-        return diff_output
+        if not branch:
+            branch = self.repo_info.default_branch
+        return ["git", "diff", f"origin/{branch}", "HEAD"] + options
 
     @staticmethod
-    def get_repo_info() -> RepoInfo:
+    def get_repo_info(refresh: bool = False, path: str = None) -> RepoInfo:
         """
         Retrieves the repository information.
 
+        Repository information is resolved from local git state, read in-process by the
+        repository's `GitBackend` where possible, and memoized per process, so repeated
+        calls do not spawn git again. The remote is only contacted when the
+        default branch cannot be resolved locally or from the on-disk cache.
+
+        Args:
+            refresh (bool): Ignore cached information and query the remote.
+            path (str): The working tree of the repository. Defaults to the current directory.
+
         Returns:
-            A tuple containing the repository name, owner name, current branch, and default branch.
+            The repository information, or None if an error occurs.
         """
+        key = os.path.abspath(path or os.getcwd())
+        if not refresh and key in repo_info_cache:
+            return repo_info_cache[key]
+
         try:
             info = RepoInfo()
             # Get the repository URL
-            repo_url = subprocess.run(
-                ["git", "config", "--get", "remote.origin.url"],
-                capture_output=True,
-                text=True,
-            ).stdout.strip()
+            backend = get_backend(path)
+            info.remote_url = backend.get_config("remote.origin.url")
 
             # Extract the owner and repository name from the URL
-            match = re.search(r"github.com[:/](.+)/(.+?)(.git)?$", repo_url)
+            match = re.search(r"github.com[:/](.+)/(.+?)(.git)?$", info.remote_url)
             if match:
                 info.owner_name = match.group(1)
                 info.repo_name = match.group(2)
@@ -158,29 +746,56 @@ class GitClient:
                 print_error("Unable to parse repository URL.")
 
             # Get the current branch name
-            info.current_branch = subprocess.run(
-                ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-                capture_output=True,
-                text=True,
-            ).stdout.strip()
+            info.current_branch = backend.get_head_branch()
 
-            # Get the default branch name
-            info.default_branch = subprocess.run(
-                ["git", "remote", "show", "origin"], capture_output=True, text=True
-            ).stdout
-            info.default_branch = re.search(
-                r"HEAD branch: (.+)", info.default_branch
-            ).group(1)
+            info.default_branch = GitClient.get_default_branch(
+                info.remote_url, refresh, path
+            )
 
+            repo_info_cache[key] = info
             return info
         except Exception as e:
             print_error()
-            return None, None, None, None
+            return None
+
+    @staticmethod
+    def get_default_branch(
+        remote_url: str, refresh: bool = False, path: str = None
+    ) -> str:
+        """
+        Retrieves the default branch of the origin remote.
+
+        Resolution order: the local `refs/remotes/origin/HEAD` ref, the on-disk repository
+        cache keyed by remote URL, and finally `git remote show origin` (network).
+
+        Args:
+            remote_url (str): The URL of the origin remote.
+            refresh (bool): Skip local resolution and query the remote.
+            path (str): The working tree of the repository. Defaults to the current directory.
+        """
+        if not refresh:
+            head = get_backend(path).get_symbolic_ref("refs/remotes/origin/HEAD")
+            if head and head.startswith("refs/remotes/origin/"):
+                return head.removeprefix("refs/remotes/origin/")
+
+            cached = read_repo_cache().get(remote_url)
+            if cached:
+                return cached["default_branch"]
+
+        remote = get_backend(path).run("remote", "show", "origin").stdout
+        default_branch = re.search(r"HEAD branch: (.+)", remote).group(1)
+
+        repo_cache = read_repo_cache()
+        repo_cache[remote_url] = {"default_branch": default_branch}
+        write_repo_cache(repo_cache)
+
+        return default_branch
 
     @staticmethod
     def push_changes():
         try:
-            subprocess.run(["git", "push"])
+            with span("git push", "git"):
+                subprocess.run(["git", "push"])
             return True
         except Exception as e:
             return False
@@ -1,15 +1,242 @@
+import os
 import requests
+import threading
+import time
+
+from typing import Optional
+from urllib3.exceptions import NewConnectionError
 
 from pushmate.commands.config import Config
-from pushmate.clients.git import GitClient
-from pushmate.utils.utils import parse_pr
+from pushmate.clients.git import GitClient, get_backend
+from pushmate.utils.messages import print_error
+from pushmate.utils.profile import span
+from pushmate.utils.stats import stats_store
+from pushmate.utils.utils import add_pr_marker, parse_pr
+
+# GitHub API used unless GITHUB_API_URL is set, e.g. by GitHub Actions when running
+# against GitHub Enterprise
+DEFAULT_API_URL = "https://api.github.com"
+
+# Longest rate limit wait worth sleeping through before giving up, in seconds
+MAX_RETRY_DELAY = 60
+
+# Requests that may have taken effect if they failed after reaching the server, e.g.
+# creating a pull request, so they are only retried when they never reached it
+NON_IDEMPOTENT_METHODS = {"POST"}
+
+# Remaining requests in the rate limit window below which requests are spread out
+# over the rest of the window
+RATE_LIMIT_RESERVE = 10
+
+
+def get_api_url() -> str:
+    """
+    Gets the GitHub API URL from the environment of the current command, which differs
+    between the commands served by the daemon.
+    """
+    return os.environ.get("GITHUB_API_URL", DEFAULT_API_URL)
+
+
+def get_headers(token: str) -> dict[str, str]:
+    """
+    Builds the GitHub API request headers for a token.
+    """
+    return {
+        "Authorization": f"token {token}",
+        "Accept": "application/vnd.github.v3+json",
+        "X-GitHub-Api-Version": "2022-11-28",
+    }
+
+
+class GitHubClient:
+    """
+    Client for the GitHub API, sharing one pooled session across requests.
+
+    Requests are retried with exponential backoff on connection errors, timeouts and
+    server errors, and rate limited requests wait for the time given by `Retry-After`
+    or `X-RateLimit-Reset` before retrying. POST requests are only retried when they
+    never reached the server or were rejected by a rate limit, so an issue or pull
+    request is never created twice.
+
+    The rate limit headers of every response pace the following requests, so they are
+    spread out before the limit is reached.
+    """
+
+    def __init__(self, token: str, timeout: tuple[float, float], max_retries: int):
+        """
+        Args:
+            token (str): The GitHub token.
+            timeout (tuple[float, float]): The connect and read timeouts, in seconds.
+            max_retries (int): Maximum # of retries of a request.
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self.session.headers.update(get_headers(token))
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Sends a request to the GitHub API, retrying when rate limited or on transient errors.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The API path, e.g. "/repos/{owner}/{repo}/pulls".
+
+        Returns:
+            The last response received.
+        """
+        start = time.perf_counter()
+        with span(f"github {method}", "github", path=path):
+            attempt = 0
+            while True:
+                self.wait()
+                try:
+                    response = self.session.request(
+                        method, f"{get_api_url()}{path}", timeout=self.timeout, **kwargs
+                    )
+                except (requests.ConnectionError, requests.Timeout) as error:
+                    retryable = method not in NON_IDEMPOTENT_METHODS
+                    if attempt >= self.max_retries or not (
+                        retryable or GitHubClient.is_unsent(error)
+                    ):
+                        raise
+                    time.sleep(2**attempt)
+                    attempt += 1
+                    continue
+
+                self.pace(response)
+                delay = GitHubClient.get_retry_delay(response, attempt, method)
+                if delay is None or attempt >= self.max_retries:
+                    if GitHubClient.is_rate_limited(response):
+                        print_error(
+                            "GitHub rate limit exceeded. Please try again later."
+                        )
+                    stats_store.record(
+                        "github", f"{method} {path}", time.perf_counter() - start
+                    )
+                    return response
+
+                time.sleep(delay)
+                attempt += 1
+
+    def wait(self):
+        """
+        Blocks until the next request is allowed by the pace set from the rate limit.
+        """
+        with self.lock:
+            delay = self.next_time - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pace(self, response: requests.Response):
+        """
+        Spreads the following requests over the rest of the rate limit window when few
+        requests remain, or holds them until the window resets when none remain.
+
+        Waits longer than `MAX_RETRY_DELAY` are not taken, so the requests fail with the
+        rate limit error instead of hanging.
+        """
+        try:
+            remaining = int(response.headers["X-RateLimit-Remaining"])
+            reset = float(response.headers["X-RateLimit-Reset"])
+        except (KeyError, ValueError):
+            return
+
+        if remaining >= RATE_LIMIT_RESERVE:
+            return
+        delay = max(reset - time.time(), 0) / (remaining + 1)
+        if delay > MAX_RETRY_DELAY:
+            return
+        with self.lock:
+            self.next_time = max(self.next_time, time.time() + delay)
+
+    def get(self, path: str, params: dict = None) -> requests.Response:
+        return self.request("GET", path, params=params)
+
+    def post(self, path: str, data: dict) -> requests.Response:
+        return self.request("POST", path, json=data)
+
+    def patch(self, path: str, data: dict) -> requests.Response:
+        return self.request("PATCH", path, json=data)
+
+    @staticmethod
+    def is_rate_limited(response: requests.Response) -> bool:
+        """
+        Checks whether a response was rejected by a primary or secondary rate limit.
+        """
+        if response.status_code == 429:
+            return True
+        return response.status_code == 403 and (
+            "Retry-After" in response.headers
+            or response.headers.get("X-RateLimit-Remaining") == "0"
+        )
+
+    @staticmethod
+    def is_unsent(error: requests.RequestException) -> bool:
+        """
+        Checks whether a request failed before the connection was established, so it
+        never reached the server.
+        """
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+
+    @staticmethod
+    def get_retry_delay(
+        response: requests.Response, attempt: int, method: str = "GET"
+    ) -> Optional[float]:
+        """
+        Determines how long to wait before retrying a request.
+
+        Args:
+            response (requests.Response): The response received.
+            attempt (int): The # of retries made so far.
+            method (str): The HTTP method. Server errors of non-idempotent requests are
+                not retried, since the request may have taken effect.
+
+        Returns:
+            The delay in seconds, or None if the request should not be retried.
+        """
+        if GitHubClient.is_rate_limited(response):
+            if "Retry-After" in response.headers:
+                delay = float(response.headers["Retry-After"])
+            elif "X-RateLimit-Reset" in response.headers:
+                delay = float(response.headers["X-RateLimit-Reset"]) - time.time() + 1
+            else:
+                delay = 2**attempt
+            delay = max(delay, 0)
+            return delay if delay <= MAX_RETRY_DELAY else None
+
+        if response.status_code >= 500 and method not in NON_IDEMPOTENT_METHODS:
+            return 2**attempt
 
+        return None
+
+
+# GitHub clients shared by every request in the process, keyed by their settings, so a
+# long-lived process picks up a new token or timeouts from the configuration
+github_clients: dict[tuple, GitHubClient] = {}
+
+
+def get_github_client() -> GitHubClient:
+    """
+    Gets the shared GitHub client for the configured settings, creating it on first use.
+    """
+    config = Config()
+    token = config.get_option("github_token")
+    timeout = (
+        float(config.get_option("connect_timeout")),
+        float(config.get_option("timeout")),
+    )
+    max_retries = int(config.get_option("max_retries"))
 
-headers = {
-    "Authorization": f"token {Config().get_option('github_token')}",
-    "Accept": "application/vnd.github.v3+json",
-    "X-GitHub-Api-Version": "2022-11-28",
-}
+    key = (token, timeout, max_retries)
+    if key not in github_clients:
+        github_clients[key] = GitHubClient(token, timeout, max_retries)
+    return github_clients[key]
 
 
 def create_pr(branch: str, message: str) -> str:
@@ -26,15 +253,16 @@ def create_pr(branch: str, message: str) -> str:
         if not branch:
             branch = info.default_branch
 
-        url = f"https://api.github.com/repos/{info.owner_name}/{info.repo_name}/pulls"
+        path = f"/repos/{info.owner_name}/{info.repo_name}/pulls"
         data = {
             "title": title,
-            "body": body,
+            # Lets `pm pr --update` only describe the commits pushed after this one
+            "body": add_pr_marker(body, get_backend().resolve("HEAD")),
             "head": info.current_branch,
             "base": branch,
         }
 
-        response = requests.post(url=url, headers=headers, json=data)
+        response = get_github_client().post(path, data)
 
         if response.status_code == 201:
             return response.json()["html_url"]
@@ -46,6 +274,54 @@ def create_pr(branch: str, message: str) -> str:
         return None
 
 
+def find_pr() -> Optional[dict]:
+    """
+    Finds the open pull request of the current branch.
+
+    Returns:
+        The pull request as returned by the GitHub API, or None if the branch has no
+        open pull request or an error occurs.
+    """
+    try:
+        info = GitClient.get_repo_info()
+        path = f"/repos/{info.owner_name}/{info.repo_name}/pulls"
+        params = {"head": f"{info.owner_name}:{info.current_branch}", "state": "open"}
+
+        response = get_github_client().get(path, params)
+
+        if response.status_code == 200 and response.json():
+            return response.json()[0]
+
+        return None
+    except Exception as e:
+        return None
+
+
+def update_pr(number: int, message: str, commit: str) -> str:
+    """
+    Replaces the title and description of a pull request.
+
+    Args:
+        number (int): The pull request number.
+        message (str): The pull request message.
+        commit (str): The commit the description covers up to, recorded in the body.
+    """
+    try:
+        title, body = parse_pr(message)
+        info = GitClient.get_repo_info()
+        path = f"/repos/{info.owner_name}/{info.repo_name}/pulls/{number}"
+        data = {"title": title, "body": add_pr_marker(body, commit)}
+
+        response = get_github_client().patch(path, data)
+
+        if response.status_code == 200:
+            return response.json()["html_url"]
+
+        return None
+    except Exception as e:
+        return None
+
+
 def create_issue(
     title: str, body: str, labels: list[str] = [], assignees: list[str] = []
 ):
@@ -60,7 +336,7 @@ def create_issue(
     """
     try:
         info = GitClient.get_repo_info()
-        url = f"https://api.github.com/repos/{info.owner_name}/{info.repo_name}/issues"
+        path = f"/repos/{info.owner_name}/{info.repo_name}/issues"
         data = {
             "title": title,
             "body": body,
@@ -68,7 +344,7 @@ def create_issue(
             "assignees": assignees,
         }
 
-        response = requests.post(url=url, headers=headers, json=data)
+        response = get_github_client().post(path, data)
 
         if response.status_code == 201:
             return response.json()["html_url"]
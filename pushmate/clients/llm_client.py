@@ -1,12 +1,78 @@
+import json
+import os
+import time
+
 from enum import Enum
-from openai import OpenAI
+from typing import Iterator
+from openai import OpenAI, Timeout
 
 from pushmate.commands.config import Config
+from pushmate.utils.cache import ResponseCache
 from pushmate.utils.messages import print_error
+from pushmate.utils.profile import timed
+from pushmate.utils.stats import stats_store
+from pushmate.utils.tokens import count_tokens
 
 
 class LLMProvider(Enum):
     OPEN_AI = "openai"
+    # Any server implementing the OpenAI chat completions API, e.g. Ollama or vLLM
+    OPEN_AI_COMPATIBLE = "openai-compatible"
+
+
+class ProviderInfo:
+    """
+    Default models and connection settings of a provider.
+    """
+
+    model: str
+    large_model: str
+    base_url: str
+    requires_key: bool
+
+    def __init__(
+        self,
+        model: str,
+        large_model: str = None,
+        base_url: str = None,
+        requires_key: bool = True,
+    ):
+        """
+        Args:
+            model (str): Fast model used for most prompts.
+            large_model (str): Larger-context model used for prompts over the routing
+                threshold. None to always use `model`.
+            base_url (str): The API endpoint. None for the SDK default.
+            requires_key (bool): Whether an API key must be configured.
+        """
+        self.model = model
+        self.large_model = large_model
+        self.base_url = base_url
+        self.requires_key = requires_key
+
+
+# Registry of supported providers. Models can be overridden with the `model` and
+# `large_model` options and the endpoint with the `base_url` option.
+PROVIDERS = {
+    LLMProvider.OPEN_AI.value: ProviderInfo("gpt-4o-mini", "gpt-4.1-mini"),
+    LLMProvider.OPEN_AI_COMPATIBLE.value: ProviderInfo(
+        "llama3.1", base_url="http://localhost:11434/v1", requires_key=False
+    ),
+}
+
+# Context window of known models, in tokens
+CONTEXT_WINDOWS = {
+    "gpt-4o-mini": 128_000,
+    "gpt-4o": 128_000,
+    "gpt-4.1-nano": 1_047_576,
+    "gpt-4.1-mini": 1_047_576,
+    "gpt-4.1": 1_047_576,
+}
+
+
+# OpenAI clients shared by every LLMClient in the process, keyed by their settings.
+# Each client keeps a pooled HTTP connection alive between prompts.
+openai_clients: dict[tuple, OpenAI] = {}
 
 
 class LLMClient:
@@ -24,46 +90,315 @@ class LLMClient:
                 "No provider set. Use [italic]pushmate config --provider[/italic] to set a provider."
             )
             self.status = False
-        self.model = ""
+        # The small model, used to count tokens. Each prompt is routed with
+        # `select_model` and the chosen model passed down, as clients are shared between
+        # threads.
+        self.model = self.get_models()[0]
+        self.cache = ResponseCache(int(self.config.get_option("cache_size")) * 1024**2)
+        self.cache_hit = False
+        self.candidates = []
 
-    def prompt(self, prompt):
+    def prompt(self, prompt, stream: bool = False, cache: bool = True):
         """
         Generate text based on a prompt
+
+        With stream=True, returns an iterator of text chunks as they are generated.
+        Responses are stored in the response cache; with cache=False a cached response
+        is ignored and a new one is generated.
         """
+        if stream:
+            return self.prompt_stream(prompt, cache)
         if not self.status:
             return ""
         try:
             response = ""
             match self.provider:
-                case LLMProvider.OPEN_AI.value:
-                    self.model = "gpt-4o-mini"
-                    response = self.openai_prompt(prompt)
+                case LLMProvider.OPEN_AI.value | LLMProvider.OPEN_AI_COMPATIBLE.value:
+                    model = self.select_model(prompt)
+                    generate = self.openai_prompt
                 case _:
                     raise ValueError(f"Provider not supported")
 
+            key = ResponseCache.get_key(prompt, self.provider, model)
+            self.cache_hit = False
+            if cache:
+                start = time.perf_counter()
+                response = self.cache.get(key)
+                if response:
+                    self.cache_hit = True
+                    self.record_cache_hit(model, start)
+                    return response
+
+            response = generate(prompt, model)
+            if response:
+                self.cache.set(key, self.provider, model, response)
+
             if response == "":
                 print_error("No response from LLM.")
 
             return response
         except Exception as e:
-            if "rate_limit_exceeded" in str(e):
-                print_error("LLM rate limit exceeded. Please try again later.")
-            else:
-                print_error()
+            self.print_prompt_error(e)
             return ""
 
-    def openai_prompt(self, prompt: list[dict[str, str]]):
+    def prompt_stream(self, prompt, cache: bool = True) -> Iterator[str]:
+        """
+        Generate text based on a prompt, yielding chunks as they are generated
+
+        When more than one candidate is configured, all candidates are requested at once:
+        the first is yielded whole and the others are kept in `candidates`.
+        """
+        self.candidates = []
+        if not self.status:
+            return
+
+        n = int(self.config.get_option("candidates"))
+        if n > 1:
+            candidates = self.prompt_candidates(prompt, n, cache)
+            if candidates:
+                self.candidates = candidates[1:]
+                yield candidates[0]
+            return
+
+        try:
+            match self.provider:
+                case LLMProvider.OPEN_AI.value | LLMProvider.OPEN_AI_COMPATIBLE.value:
+                    model = self.select_model(prompt)
+                    generate = self.openai_prompt_stream
+                case _:
+                    raise ValueError(f"Provider not supported")
+
+            key = ResponseCache.get_key(prompt, self.provider, model)
+            self.cache_hit = False
+            if cache:
+                start = time.perf_counter()
+                response = self.cache.get(key)
+                if response:
+                    self.cache_hit = True
+                    self.record_cache_hit(model, start)
+                    yield response
+                    return
+
+            response = ""
+            for chunk in generate(prompt, model):
+                response += chunk
+                yield chunk
+
+            if response:
+                self.cache.set(key, self.provider, model, response)
+            else:
+                print_error("No response from LLM.")
+        except Exception as e:
+            self.print_prompt_error(e)
+
+    def prompt_candidates(self, prompt, n: int, cache: bool = True) -> list[str]:
+        """
+        Generate several candidate responses to a prompt in a single request
+        """
+        if not self.status:
+            return []
+        try:
+            match self.provider:
+                case LLMProvider.OPEN_AI.value | LLMProvider.OPEN_AI_COMPATIBLE.value:
+                    model = self.select_model(prompt)
+                    generate = self.openai_prompt_candidates
+                case _:
+                    raise ValueError(f"Provider not supported")
+
+            key = ResponseCache.get_key(prompt, self.provider, model, n)
+            self.cache_hit = False
+            if cache:
+                start = time.perf_counter()
+                response = self.cache.get(key)
+                if response:
+                    self.cache_hit = True
+                    self.record_cache_hit(model, start)
+                    return json.loads(response)
+
+            candidates = generate(prompt, model, n)
+            if candidates:
+                self.cache.set(key, self.provider, model, json.dumps(candidates))
+            else:
+                print_error("No response from LLM.")
+
+            return candidates
+        except Exception as e:
+            self.print_prompt_error(e)
+            return []
+
+    def get_models(self) -> tuple[str, str]:
+        """
+        Get the configured small and large models of the provider
+
+        Returns:
+            A tuple of the small model and the large model, which is None when prompts
+            are never routed to a larger model.
+        """
+        provider = PROVIDERS.get(self.provider)
+        if not provider:
+            return "", None
+
+        model = self.config.get_option("model") or provider.model
+        large_model = self.config.get_option("large_model") or provider.large_model
+        if large_model == model:
+            large_model = None
+        return model, large_model
+
+    def select_model(self, prompt: list[dict[str, str]]) -> str:
+        """
+        Route a prompt to the small model, or to the large model when the prompt is over
+        the routing threshold or does not fit in the small model's context window
+        """
+        model, large_model = self.get_models()
+        if not large_model:
+            return model
+
+        tokens = sum(count_tokens(message["content"], model) for message in prompt)
+        threshold = int(self.config.get_option("large_model_threshold"))
+        if tokens > threshold or tokens > CONTEXT_WINDOWS.get(model, tokens):
+            return large_model
+        return model
+
+    def print_prompt_error(self, e: Exception):
+        """
+        Print an error raised while prompting the LLM
+        """
+        if "rate_limit_exceeded" in str(e):
+            print_error("LLM rate limit exceeded. Please try again later.")
+        else:
+            print_error()
+
+    @timed("openai completion", "llm")
+    def openai_prompt(self, prompt: list[dict[str, str]], model: str):
         """
         Generate text based on a prompt using OpenAI
         """
-        api_key = self.config.get_option("openai")
-        if not api_key:
-            print_error("OpenAI API key not set.")
+        client = self.get_client()
+        if not client:
             return ""
 
-        client = OpenAI(api_key=api_key)
-        completion = client.chat.completions.create(model=self.model, messages=prompt)
+        start = time.perf_counter()
+        completion = client.chat.completions.create(model=model, messages=prompt)
         if not completion:
             return ""
 
-        return completion.choices[0].message.content
+        response = completion.choices[0].message.content
+        self.record_call(prompt, model, start, completion.usage, response)
+        return response
+
+    @timed("openai stream", "llm")
+    def openai_prompt_stream(
+        self, prompt: list[dict[str, str]], model: str
+    ) -> Iterator[str]:
+        """
+        Generate text based on a prompt using OpenAI, yielding chunks as they are generated
+        """
+        client = self.get_client()
+        if not client:
+            return
+
+        start = time.perf_counter()
+        options = {}
+        if self.provider == LLMProvider.OPEN_AI.value:
+            # Token usage is sent in a final chunk without choices
+            options["stream_options"] = {"include_usage": True}
+        stream = client.chat.completions.create(
+            model=model, messages=prompt, stream=True, **options
+        )
+        response = ""
+        usage = None
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                response += chunk.choices[0].delta.content
+                yield chunk.choices[0].delta.content
+        self.record_call(prompt, model, start, usage, response)
+
+    @timed("openai candidates", "llm")
+    def openai_prompt_candidates(
+        self, prompt: list[dict[str, str]], model: str, n: int
+    ) -> list[str]:
+        """
+        Generate several candidate responses to a prompt using OpenAI
+        """
+        client = self.get_client()
+        if not client:
+            return []
+
+        start = time.perf_counter()
+        completion = client.chat.completions.create(model=model, messages=prompt, n=n)
+        if not completion:
+            return []
+
+        candidates = [
+            choice.message.content
+            for choice in completion.choices
+            if choice.message.content
+        ]
+        self.record_call(prompt, model, start, completion.usage, "".join(candidates))
+        return candidates
+
+    def record_call(
+        self,
+        prompt: list[dict[str, str]],
+        model: str,
+        start: float,
+        usage,
+        response: str,
+    ):
+        """
+        Record a completed request in the stats store, estimating the token counts when
+        the provider did not report its usage
+        """
+        if usage:
+            tokens = usage.prompt_tokens, usage.completion_tokens
+        else:
+            tokens = (
+                sum(count_tokens(message["content"], model) for message in prompt),
+                count_tokens(response, model),
+            )
+        stats_store.record("llm", model, time.perf_counter() - start, *tokens)
+
+    def record_cache_hit(self, model: str, start: float):
+        """
+        Record a response served from the cache in the stats store
+        """
+        stats_store.record("llm", model, time.perf_counter() - start, cache_hit=True)
+
+    def get_client(self) -> OpenAI:
+        """
+        Get the pooled client for the provider's endpoint, or None if it has no API key
+        """
+        provider = PROVIDERS[self.provider]
+        api_key = self.config.get_option("openai")
+        if not api_key:
+            if provider.requires_key:
+                print_error("OpenAI API key not set.")
+                return None
+            # Local servers ignore the key, but the SDK requires one
+            api_key = "none"
+
+        base_url = self.config.get_option("base_url") or provider.base_url
+        return self.get_openai_client(api_key, base_url)
+
+    def get_openai_client(self, api_key: str, base_url: str = None) -> OpenAI:
+        """
+        Get the pooled OpenAI client for the given API key and endpoint, creating it on first use
+        """
+        timeout = float(self.config.get_option("timeout"))
+        connect_timeout = float(self.config.get_option("connect_timeout"))
+        max_retries = int(self.config.get_option("max_retries"))
+        # Resolved here rather than by the SDK, so commands served by the daemon use the
+        # endpoint of their own environment
+        base_url = base_url or os.environ.get("OPENAI_BASE_URL")
+
+        key = (api_key, base_url, timeout, connect_timeout, max_retries)
+        if key not in openai_clients:
+            openai_clients[key] = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=Timeout(timeout, connect=connect_timeout),
+                max_retries=max_retries,
+            )
+        return openai_clients[key]
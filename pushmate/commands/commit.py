@@ -1,27 +1,39 @@
+import glob
 import inquirer
+import os
+import threading
 import typer
 
-from rich import print
+from concurrent.futures import ThreadPoolExecutor
 from rich.console import Console
-from rich.markdown import Markdown
 from rich.prompt import Prompt
-
+from rich.table import Table
 
 from pushmate.commands.config import Config
 from pushmate.clients.git import GitClient, GitTarget
 from pushmate.clients.llm_client import LLMClient
+from pushmate.commands.hook import get_pregenerated, is_installed
+from pushmate.utils.compaction import compact_diff
+from pushmate.utils.conversation import REFINEMENT_BUDGET_SHARE, Conversation
+from pushmate.utils.diff import DiffFile
 from pushmate.utils.editor import edit_text
 from pushmate.utils.messages import (
     get_prompt,
     get_status,
     print_abort,
     print_error,
+    print_info,
+    print_message,
+    print_stream,
     print_success,
 )
+from pushmate.utils.profile import timed
+from pushmate.utils.stats import set_context, set_thread_context
 
 console = Console()
 
 
+@timed("pm commit", "command")
 def run_commit(max_chars: int):
     git_client = GitClient(GitTarget.COMMIT)
     with console.status(get_status("retrieving changed files")):
@@ -30,16 +42,46 @@ def run_commit(max_chars: int):
     if not git_client.valid_files:
         raise typer.Exit()
 
-    for filename, changes in invalid_files:
+    set_context(diff_size=git_client.diff_index.count_changes())
+    llm_client = LLMClient()
+    token_budget = int(Config().get_option("token_budget"))
+
+    # A message pre-generated by the git hooks is only used for the exact staged changes.
+    # Getting the index tree copies the index, so it is skipped without the hooks.
+    pregenerated = None
+    if is_installed(git_client.path):
+        pregenerated = get_pregenerated(git_client.get_index_tree(), max_chars)
+
+    # Generate for the files accepted so far while the user decides on the others
+    speculation = None
+    speculated_files = list(git_client.valid_files)
+    if (
+        invalid_files
+        and llm_client.status
+        and not (pregenerated and pregenerated["paths"] == speculated_files)
+    ):
+        speculation = threading.Thread(
+            target=speculate,
+            args=(git_client, speculated_files, max_chars, token_budget),
+            daemon=True,
+        )
+        speculation.start()
+
+    for file in invalid_files:
         confirmation = Prompt.ask(
             get_prompt(
-                f"file {filename} has {changes} changes: include in commit message?"
+                f"file {file.path} has {file.changes} changes: include in commit message?"
             ),
             choices=["y", "N"],
             default="N",
         )
         if confirmation.lower() == "y":
-            git_client.valid_files.append(filename)
+            git_client.valid_files.append(file.path)
+
+    # With no files added, the speculative message is the one the loop would generate
+    if speculation and git_client.valid_files == speculated_files:
+        with console.status(get_status("generating commit message")):
+            speculation.join()
 
     with console.status(get_status("analyzing changed files")):
         diff_output = git_client.get_diffs()
@@ -51,13 +93,44 @@ def run_commit(max_chars: int):
         print_error("could not analyze changed files")
         raise typer.Exit()
 
-    llm_client = LLMClient()
+    diff_output, dropped = compact_diff(
+        git_client.diff_index,
+        git_client.valid_files,
+        token_budget,
+        llm_client.model,
+    )
+    for note in dropped:
+        print_info(f"diff compacted to fit the token budget: {note}")
     generation = "generating"
     message = None
-    conversation = get_commit_prompt(diff_output, max_chars)
+    # Refinement turns send a smaller compaction of the changes instead of the full diff
+    conversation = Conversation(
+        get_commit_prompt(diff_output, max_chars),
+        lambda: compact_diff(
+            git_client.diff_index,
+            git_client.valid_files,
+            int(token_budget * REFINEMENT_BUDGET_SHARE),
+            llm_client.model,
+        )[0],
+    )
+    candidates = []
+    if pregenerated and pregenerated["paths"] == git_client.valid_files:
+        candidates = [pregenerated["message"]]
     while not message:
-        with console.status(get_status(f"{generation} commit message")):
-            message = llm_client.prompt(conversation)
+        # Show the next candidate from the last request before asking the LLM again
+        if candidates:
+            message = candidates.pop(0)
+            print_message(message)
+        else:
+            message = print_stream(
+                llm_client.prompt(
+                    conversation.messages(),
+                    stream=True,
+                    cache=generation != "regenerating",
+                ),
+                get_status(f"{generation} commit message"),
+            )
+            candidates = llm_client.candidates
 
         if message:
             print_success("commit message generated")
@@ -65,7 +138,6 @@ def run_commit(max_chars: int):
             print_error("unable to generate commit message")
             raise typer.Exit()
 
-        print(Markdown(f"```md\n{message}\n```"))
         confirmation = inquirer.prompt(
             [
                 inquirer.List(
@@ -87,18 +159,17 @@ def run_commit(max_chars: int):
             raise typer.Exit()
 
         elif confirmation.lower() == "regenerate commit message":
-            conversation.append(
-                {
-                    "role": "user",
-                    "content": "Edit this commit message for clarity and concision.",
-                }
-            )
+            if not candidates:
+                conversation.refine(
+                    message, "Edit this commit message for clarity and concision."
+                )
+                generation = "regenerating"
             message = None
-            generation = "regenerating"
 
         elif confirmation.lower() == "instruct llm on improvements":
             feedback = Prompt.ask(get_prompt("feedback"))
-            conversation.append({"role": "user", "content": feedback})
+            conversation.refine(message, feedback)
+            candidates = []
             message = None
             generation = "regenerating with feedback"
 
@@ -115,6 +186,212 @@ def run_commit(max_chars: int):
         raise typer.Exit()
 
 
+def speculate(
+    git_client: GitClient,
+    paths: list[str],
+    max_chars: int,
+    token_budget: int,
+):
+    """
+    Generates a commit message in the background for the given files.
+
+    The result is not returned: it is stored in the response cache, so the review loop
+    picks it up instantly if it ends up prompting with the same files. A separate
+    LLMClient is used so the review loop's client state is never shared.
+    """
+    try:
+        llm_client = LLMClient()
+        diff_output, _ = compact_diff(
+            git_client.diff_index, paths, token_budget, llm_client.model
+        )
+        conversation = get_commit_prompt(diff_output, max_chars)
+        for _ in llm_client.prompt(conversation, stream=True):
+            pass
+    except Exception:
+        # Speculation is best effort; the review loop generates the message if needed
+        pass
+
+
+class RepoCommit:
+    """
+    A commit being prepared in one repository of a multi-repository commit.
+    """
+
+    path: str
+    git_client: GitClient
+    message: str
+    skipped: list[DiffFile]
+    error: str
+
+    def __init__(self, path: str):
+        self.path = path
+        self.git_client = GitClient(GitTarget.COMMIT, path=path, quiet=True)
+        self.message = ""
+        self.skipped = []
+        self.error = None
+
+
+@timed("pm commit --repos", "command")
+def run_multi_commit(repos: str, max_chars: int):
+    """
+    Generates and creates commits in many repositories at once.
+
+    Diffs are collected and commit messages generated for every repository
+    concurrently, then all messages are reviewed on one screen before committing.
+    Files over the change limit are left out rather than prompted for.
+
+    Args:
+        repos (str): Comma-separated list of repository paths or glob patterns.
+        max_chars (int): Override of the maximum # of characters for the commit messages.
+    """
+    paths = find_repos(repos)
+    if not paths:
+        print_error("no git repositories matched")
+        raise typer.Exit()
+
+    llm_client = LLMClient()
+    token_budget = int(Config().get_option("token_budget"))
+
+    def prepare(path: str) -> RepoCommit:
+        commit = RepoCommit(path)
+        commit.skipped = commit.git_client.get_diff_files() or []
+        if not commit.git_client.valid_files:
+            commit.error = commit.git_client.error or "no changes staged to commit"
+            return commit
+
+        set_thread_context(
+            repo=commit.git_client.backend.get_toplevel() or path,
+            diff_size=commit.git_client.diff_index.count_changes(),
+        )
+
+        commit.git_client.get_diffs()
+        diff_output, _ = compact_diff(
+            commit.git_client.diff_index,
+            commit.git_client.valid_files,
+            token_budget,
+            llm_client.model,
+        )
+        commit.message = llm_client.prompt(get_commit_prompt(diff_output, max_chars))
+        if not commit.message:
+            commit.error = "unable to generate commit message"
+        return commit
+
+    with console.status(
+        get_status(f"generating commit messages for {len(paths)} repositories")
+    ):
+        with ThreadPoolExecutor(
+            max_workers=int(Config().get_option("concurrency"))
+        ) as executor:
+            commits = list(executor.map(prepare, paths))
+
+    for commit in commits:
+        if commit.error:
+            print_info(f"skipping [bold]{commit.path}[/bold]: {commit.error}")
+    commits = [commit for commit in commits if not commit.error]
+    if not commits:
+        print_error("no commit messages generated")
+        raise typer.Exit()
+
+    while True:
+        table = Table("repository", "commit message", "files left out")
+        for commit in commits:
+            table.add_row(
+                commit.path,
+                commit.message,
+                ", ".join(file.path for file in commit.skipped),
+            )
+        console.print(table)
+
+        confirmation = inquirer.prompt(
+            [
+                inquirer.List(
+                    "action",
+                    message=f"create {len(commits)} commits with these messages?",
+                    choices=[
+                        "create commits",
+                        "edit a commit message",
+                        "regenerate a commit message",
+                        "exclude repositories",
+                        "abort",
+                    ],
+                ),
+            ]
+        )["action"]
+
+        if confirmation == "abort":
+            print_abort("commits aborted")
+            raise typer.Exit()
+
+        elif confirmation == "create commits":
+            break
+
+        elif confirmation == "exclude repositories":
+            excluded = inquirer.prompt(
+                [
+                    inquirer.Checkbox(
+                        "repos",
+                        message="repositories to exclude",
+                        choices=[commit.path for commit in commits],
+                    )
+                ]
+            )["repos"]
+            commits = [commit for commit in commits if commit.path not in excluded]
+            if not commits:
+                print_abort("commits aborted")
+                raise typer.Exit()
+
+        else:
+            path = inquirer.prompt(
+                [
+                    inquirer.List(
+                        "repo",
+                        message="repository",
+                        choices=[commit.path for commit in commits],
+                    )
+                ]
+            )["repo"]
+            commit = next(commit for commit in commits if commit.path == path)
+            if confirmation == "edit a commit message":
+                commit.message = edit_text(commit.message)
+            else:
+                conversation = get_commit_prompt(
+                    compact_diff(
+                        commit.git_client.diff_index,
+                        commit.git_client.valid_files,
+                        token_budget,
+                        llm_client.model,
+                    )[0],
+                    max_chars,
+                )
+                message = print_stream(
+                    llm_client.prompt(conversation, stream=True, cache=False),
+                    get_status("regenerating commit message"),
+                )
+                if message:
+                    commit.message = message
+
+    for commit in commits:
+        if commit.git_client.create_commit(commit.message):
+            print_success(f"commit created in [bold]{commit.path}[/bold]")
+        else:
+            print_error(f"could not create commit in [bold]{commit.path}[/bold]")
+
+
+def find_repos(repos: str) -> list[str]:
+    """
+    Expands a comma-separated list of paths and glob patterns into git working trees.
+    """
+    paths = []
+    for pattern in repos.split(","):
+        pattern = os.path.expanduser(pattern.strip())
+        if not pattern:
+            continue
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            if os.path.exists(os.path.join(path, ".git")) and path not in paths:
+                paths.append(path)
+    return paths
+
+
 def get_commit_prompt(diff_output: str, max_chars) -> list[dict[str, str]]:
     """
     Generates a commit prompt based on the given diff output.
@@ -1,8 +1,13 @@
 import os
+import tempfile
 import typer
 import yaml
 
-CONFIG_FILE_PATH = os.path.join(typer.get_app_dir("pushmate"), "config.yml")
+APP_DIR = typer.get_app_dir("pushmate")
+CONFIG_FILE_PATH = os.path.join(APP_DIR, "config.yml")
+
+# (mtime, size) of each configuration file when it was last loaded by this process
+loaded_stats: dict[str, tuple[int, int]] = {}
 
 
 class Config:
@@ -11,6 +16,21 @@ class Config:
     max_chars: int = 50
     github_token: str = ""
     openai: str = None
+    timeout: int = 60
+    connect_timeout: int = 10
+    max_retries: int = 2
+    cache_size: int = 10
+    token_budget: int = 12000
+    concurrency: int = 4
+    candidates: int = 1
+    model: str = None
+    large_model: str = None
+    large_model_threshold: int = 8000
+    base_url: str = None
+    ignore: str = (
+        "package-lock.json,yarn.lock,pnpm-lock.yaml,poetry.lock,uv.lock,Pipfile.lock,"
+        "Cargo.lock,Gemfile.lock,composer.lock,go.sum"
+    )
 
     def set_option(self, option: str, value: str):
         """
@@ -46,22 +66,46 @@ class Config:
     def write_config(self, path: str = CONFIG_FILE_PATH):
         """
         Write configuration to file
+
+        The file is written to a temporary file and atomically renamed into place, so
+        concurrent processes never read a partially written configuration.
         """
-        config_dir = os.path.dirname(CONFIG_FILE_PATH)
+        config_dir = os.path.dirname(path)
         if not os.path.exists(config_dir):
             os.makedirs(config_dir)
 
         config_data = self.get_options()
-        with open(path, "w") as file:
+        with tempfile.NamedTemporaryFile(
+            "w", dir=config_dir, prefix=".config-", suffix=".tmp", delete=False
+        ) as file:
             yaml.dump(config_data, file)
+        os.replace(file.name, path)
+        loaded_stats[path] = get_stat(path)
 
     def read_config(self, path: str = CONFIG_FILE_PATH):
         """
         Read configuration from file
+
+        The file is only parsed when its mtime or size changed since it was last loaded
+        by this process; otherwise the in-memory options are already current.
         """
         if not self.check_config():
             self.write_config()
+
+        stat = get_stat(path)
+        if loaded_stats.get(path) == stat:
+            return
+
         with open(path, "r") as file:
-            config_data = yaml.safe_load(file)
+            config_data = yaml.safe_load(file) or {}
             for k, v in config_data.items():
                 setattr(Config, k, v)
+        loaded_stats[path] = stat
+
+
+def get_stat(path: str) -> tuple[int, int]:
+    """
+    Returns the (mtime, size) signature of a file.
+    """
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
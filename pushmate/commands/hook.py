@@ -0,0 +1,281 @@
+import json
+import os
+import sys
+import time
+
+from typing import Optional
+
+from pushmate.commands.config import APP_DIR, Config
+from pushmate.clients.git import GitClient, GitTarget
+from pushmate.utils.cache import ResponseCache
+from pushmate.utils.messages import print_error, print_info, print_success
+
+# Marks hook scripts written by PushMate, so they are never confused with user hooks
+HOOK_MARKER = "# Installed by pushmate"
+
+HOOK_SCRIPTS = {
+    # Runs in the background so `git add` returns immediately
+    "post-index-change": """#!/bin/sh
+{marker}: pre-generates a commit message whenever the index changes
+# Skip checkouts and resets, which update the working tree, and rebases, merges,
+# cherry-picks and reverts, which write the index many times
+[ "$1" = 1 ] && exit 0
+git_dir=$(git rev-parse --git-dir 2>/dev/null) || exit 0
+for state in rebase-merge rebase-apply MERGE_HEAD CHERRY_PICK_HEAD REVERT_HEAD; do
+    [ -e "$git_dir/$state" ] && exit 0
+done
+unset GIT_INDEX_FILE
+"{python}" -m pushmate hook post-index-change >/dev/null 2>&1 </dev/null &
+""",
+    "prepare-commit-msg": """#!/bin/sh
+{marker}: fills in the pre-generated commit message when it is ready
+"{python}" -m pushmate hook prepare-commit-msg "$@" 2>/dev/null
+exit 0
+""",
+}
+
+# Seconds to wait for the index to settle before pre-generating, e.g. between several
+# `git add` commands in a row
+PREGENERATE_DELAY = 2.0
+
+# Claims of the index trees being pre-generated, so each is generated by only one run
+CLAIMS_DIR = os.path.join(APP_DIR, "pregenerate")
+
+# Seconds after which a claim is considered left behind by a run that was killed
+CLAIM_TIMEOUT = 600
+
+
+def run_install():
+    """
+    Installs the pre-generation hooks in the current repository.
+
+    Existing hooks not written by PushMate are left untouched.
+    """
+    hooks_dir = get_hooks_dir()
+    if not hooks_dir:
+        print_error("not in a git repository")
+        return
+
+    os.makedirs(hooks_dir, exist_ok=True)
+    for name, script in HOOK_SCRIPTS.items():
+        path = os.path.join(hooks_dir, name)
+        if os.path.exists(path) and not is_own_hook(path):
+            print_error(
+                f"a {name} hook already exists at [bold]{path}[/bold]: add "
+                f'[bold]{sys.executable} -m pushmate hook {name} "$@"[/bold] to it'
+            )
+            continue
+
+        with open(path, "w") as file:
+            file.write(script.format(marker=HOOK_MARKER, python=sys.executable))
+        os.chmod(path, 0o755)
+        print_success(f"installed [bold]{name}[/bold] hook")
+
+
+def run_uninstall():
+    """
+    Removes the pre-generation hooks from the current repository.
+    """
+    hooks_dir = get_hooks_dir()
+    if not hooks_dir:
+        print_error("not in a git repository")
+        return
+
+    for name in HOOK_SCRIPTS:
+        path = os.path.join(hooks_dir, name)
+        if os.path.exists(path) and is_own_hook(path):
+            os.remove(path)
+            print_success(f"removed [bold]{name}[/bold] hook")
+        else:
+            print_info(f"no [bold]{name}[/bold] hook installed by pushmate")
+
+
+def run_post_index_change():
+    """
+    Generates a commit message for the staged changes ahead of `pm commit` and
+    `git commit`, keyed on the tree of the index.
+
+    Gives up if the index changes again within `PREGENERATE_DELAY` seconds, since a
+    newer run will handle it, or if another run already claimed the same tree. Files
+    over the change limit are left out, as they would be by declining them in
+    `pm commit`.
+    """
+    git_client = GitClient(GitTarget.COMMIT, quiet=True)
+    tree = git_client.get_index_tree()
+    if not tree or get_pregenerated(tree, 0) or not claim_tree(tree):
+        return
+
+    try:
+        time.sleep(PREGENERATE_DELAY)
+        if git_client.get_index_tree() == tree:
+            pregenerate(git_client, tree)
+    finally:
+        release_tree(tree)
+
+
+def pregenerate(git_client: GitClient, tree: str):
+    """
+    Generates and stores the commit message for the staged changes of a claimed tree.
+    """
+    from pushmate.clients.llm_client import LLMClient
+    from pushmate.commands.commit import get_commit_prompt
+    from pushmate.utils.compaction import compact_diff
+    from pushmate.utils.stats import set_context
+
+    git_client.get_diff_files()
+    if not git_client.valid_files:
+        return
+
+    set_context(diff_size=git_client.diff_index.count_changes())
+
+    llm_client = LLMClient()
+    if not llm_client.status:
+        return
+
+    git_client.get_diffs()
+    diff_output, _ = compact_diff(
+        git_client.diff_index,
+        git_client.valid_files,
+        int(Config().get_option("token_budget")),
+        llm_client.model,
+    )
+    # Streamed like `pm commit`, so the response is cached under the same key
+    message = "".join(llm_client.prompt(get_commit_prompt(diff_output, 0), stream=True))
+    if message:
+        set_pregenerated(tree, 0, git_client.valid_files, message)
+
+
+def run_prepare_commit_msg(message_file: str, source: str = ""):
+    """
+    Fills in the pre-generated message for a plain `git commit` if the tree being
+    committed matches the tree it was generated for.
+
+    Args:
+        message_file (str): The file holding the commit message.
+        source (str): Where git got the message from. Messages given with -m, -F,
+            templates, merges, squashes and amends are left alone.
+    """
+    if source:
+        return
+
+    # Honors GIT_INDEX_FILE, which git sets when committing with -a or with paths
+    tree = GitClient(GitTarget.COMMIT, quiet=True).get_index_tree()
+    pregenerated = get_pregenerated(tree, 0)
+    if not pregenerated:
+        return
+
+    with open(message_file, "r") as file:
+        content = file.read()
+    with open(message_file, "w") as file:
+        file.write(f"{pregenerated['message'].strip()}\n{content}")
+
+
+def claim_tree(tree: str) -> bool:
+    """
+    Claims an index tree for pre-generation.
+
+    Returns:
+        True if the tree was claimed, False if another run is pre-generating it.
+    """
+    path = os.path.join(CLAIMS_DIR, tree)
+    try:
+        os.makedirs(CLAIMS_DIR, exist_ok=True)
+        if (
+            os.path.exists(path)
+            and time.time() - os.path.getmtime(path) > CLAIM_TIMEOUT
+        ):
+            os.remove(path)
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except OSError:
+        return False
+
+
+def release_tree(tree: str):
+    try:
+        os.remove(os.path.join(CLAIMS_DIR, tree))
+    except OSError:
+        pass
+
+
+def get_pregenerated(tree: str, max_chars: int) -> Optional[dict]:
+    """
+    Gets the message pre-generated for an index tree.
+
+    Args:
+        tree (str): The tree object name of the index.
+        max_chars (int): Override of the maximum # of characters for the commit message.
+
+    Returns:
+        A dict with the "message" and the "paths" it was generated from, or None if no
+        message was generated for this tree.
+    """
+    if not tree:
+        return None
+    response = get_cache().get(get_pregenerated_key(tree, max_chars))
+    try:
+        return json.loads(response) if response else None
+    except ValueError:
+        return None
+
+
+def set_pregenerated(tree: str, max_chars: int, paths: list[str], message: str):
+    config = Config()
+    get_cache().set(
+        get_pregenerated_key(tree, max_chars),
+        config.get_option("provider"),
+        "",
+        json.dumps({"paths": paths, "message": message}),
+    )
+
+
+def get_pregenerated_key(tree: str, max_chars: int) -> str:
+    """
+    Builds the response cache key of the message pre-generated for an index tree.
+
+    Messages written for a different index or character limit never match, so stale
+    messages are never used and are evicted with the rest of the cache.
+    """
+    config = Config()
+    if max_chars == 0:
+        max_chars = config.get_option("max_chars")
+    return ResponseCache.get_key(
+        [{"role": "index", "content": f"{tree} {max_chars}"}],
+        config.get_option("provider"),
+        "",
+    )
+
+
+def get_cache() -> ResponseCache:
+    return ResponseCache(int(Config().get_option("cache_size")) * 1024**2)
+
+
+def get_hooks_dir(path: str = None) -> str:
+    """
+    Gets the hooks directory of a repository, honoring core.hooksPath.
+
+    Args:
+        path (str): The working tree of the repository. Defaults to the current directory.
+    """
+    client = GitClient(GitTarget.COMMIT, path=path, quiet=True)
+    result = client.backend.run("rev-parse", "--git-path", "hooks")
+    if result.returncode != 0:
+        return None
+    return os.path.abspath(os.path.join(path or os.getcwd(), result.stdout.strip()))
+
+
+def is_installed(path: str = None) -> bool:
+    """
+    Checks whether the pre-generation hooks are installed in a repository, so commands
+    only look for pre-generated messages where there can be any.
+    """
+    hooks_dir = get_hooks_dir(path)
+    return bool(hooks_dir) and is_own_hook(os.path.join(hooks_dir, "post-index-change"))
+
+
+def is_own_hook(path: str) -> bool:
+    try:
+        with open(path, "r") as file:
+            return HOOK_MARKER in file.read()
+    except (OSError, UnicodeDecodeError):
+        return False
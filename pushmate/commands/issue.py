@@ -1,27 +1,45 @@
+import csv
+import hashlib
 import inquirer
+import json
+import os
+import tempfile
+import threading
 import typer
+import yaml
 
-from rich import print
+from concurrent.futures import ThreadPoolExecutor
 from rich.console import Console
-from rich.markdown import Markdown
 from rich.prompt import Prompt
 
+from pushmate.commands.config import APP_DIR, Config
 from pushmate.clients.git import GitClient
 from pushmate.clients.github import create_issue
 from pushmate.clients.llm_client import LLMClient
+from pushmate.utils.conversation import Conversation
 from pushmate.utils.editor import edit_text
 from pushmate.utils.messages import (
     get_prompt,
     get_status,
     print_abort,
     print_error,
+    print_info,
+    print_message,
+    print_stream,
     print_success,
 )
+from pushmate.utils.profile import timed
+from pushmate.utils.utils import Pacer
 
+CHECKPOINT_DIR = os.path.join(APP_DIR, "checkpoints")
+
+# Minimum seconds between issue creation requests, per GitHub's secondary rate limit guidance
+ISSUE_INTERVAL = 1.0
 
 console = Console()
 
 
+@timed("pm issue", "command")
 def run_issue():
     title = Prompt.ask(get_prompt("issue title"))
     body = Prompt.ask(get_prompt("issue description"))
@@ -34,11 +52,24 @@ def run_issue():
     if summarize.lower() == "y":
         llm_client = LLMClient()
         status = "summarizing"
-        conversation = get_issue_prompt(title, body)
+        conversation = Conversation(get_issue_prompt(title, body))
         summary = None
+        candidates = []
         while not summary:
-            with console.status(get_status(f"{status} issue summary")):
-                summary = llm_client.prompt(conversation)
+            # Show the next candidate from the last request before asking the LLM again
+            if candidates:
+                summary = candidates.pop(0)
+                print_message(summary)
+            else:
+                summary = print_stream(
+                    llm_client.prompt(
+                        conversation.messages(),
+                        stream=True,
+                        cache=status != "regenerating",
+                    ),
+                    get_status(f"{status} issue summary"),
+                )
+                candidates = llm_client.candidates
 
             if summary:
                 print_success("issue summary generated")
@@ -46,7 +77,6 @@ def run_issue():
                 print_error("unable to generate issue summary")
                 raise typer.Exit()
 
-            print(Markdown(f"```md\n{summary}\n```"))
             confirmation = inquirer.prompt(
                 [
                     inquirer.List(
@@ -68,18 +98,18 @@ def run_issue():
                 raise typer.Exit()
 
             elif confirmation.lower() == "regenerate issue summary":
-                conversation.append(
-                    {
-                        "role": "user",
-                        "content": "Edit this issue description for clarity and concision.",
-                    }
-                )
+                if not candidates:
+                    conversation.refine(
+                        summary,
+                        "Edit this issue description for clarity and concision.",
+                    )
+                    status = "regenerating"
                 summary = None
-                status = "regenerating"
 
             elif confirmation.lower() == "instruct llm on improvements":
                 feedback = Prompt.ask(get_prompt("feedback"))
-                conversation.append({"role": "user", "content": feedback})
+                conversation.refine(summary, feedback)
+                candidates = []
                 summary = None
                 status = "regenerating with feedback"
 
@@ -106,6 +136,163 @@ def run_issue():
         raise typer.Exit()
 
 
+@timed("pm issue --from-file", "command")
+def run_bulk_issue(path: str, summarize: bool = False):
+    """
+    Creates every issue listed in a YAML, CSV or JSONL file.
+
+    Issues are summarized (optionally) and created concurrently, with creation requests
+    paced to stay under GitHub's secondary rate limits. Created issues are recorded in
+    a checkpoint so that an interrupted run resumes where it left off.
+
+    Args:
+        path (str): The file listing the issues.
+        summarize (bool): Summarize each issue description with AI before creating it.
+    """
+    try:
+        issues = read_issues(path)
+    except Exception as e:
+        print_error(f"could not read issues from {path}: {e}")
+        raise typer.Exit()
+
+    checkpoint_path = get_checkpoint_path(path)
+    checkpoint = read_checkpoint(checkpoint_path)
+    pending = [issue for issue in issues if get_issue_key(issue) not in checkpoint]
+    if len(pending) < len(issues):
+        print_info(
+            f"resuming: {len(issues) - len(pending)} of {len(issues)} issues already created"
+        )
+
+    llm_client = LLMClient() if summarize else None
+    pacer = Pacer(ISSUE_INTERVAL)
+    lock = threading.Lock()
+
+    def create(issue: dict) -> bool:
+        body = issue["body"]
+        if llm_client:
+            body = llm_client.prompt(get_issue_prompt(issue["title"], body))
+            if not body:
+                print_error(f"unable to summarize issue: {issue['title']}")
+                return False
+
+        pacer.wait()
+        issue_link = create_issue(
+            issue["title"], body, issue["labels"], issue["assignees"]
+        )
+        if not issue_link or issue_link == "422":
+            print_error(f"could not create issue: {issue['title']}")
+            return False
+
+        with lock:
+            checkpoint[get_issue_key(issue)] = issue_link
+            write_checkpoint(checkpoint_path, checkpoint)
+        print_success(f"created issue [bold]{issue['title']}[/bold]: {issue_link}")
+        return True
+
+    with ThreadPoolExecutor(
+        max_workers=int(Config().get_option("concurrency"))
+    ) as executor:
+        results = list(executor.map(create, pending))
+
+    failed = results.count(False)
+    if failed:
+        print_error(
+            f"{failed} of {len(issues)} issues failed: rerun the command to retry them"
+        )
+        raise typer.Exit(code=1)
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    print_success(f"{len(issues)} issues created")
+
+
+def read_issues(path: str) -> list[dict]:
+    """
+    Reads issues from a YAML, CSV or JSONL file.
+
+    YAML files contain a list of issues (optionally under an "issues" key), CSV files
+    have a header row and JSONL files contain one issue per line. Each issue has a
+    "title" and optional "body", "labels" and "assignees", where labels and assignees
+    are lists or comma-separated strings.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, "r", newline="") as file:
+        if extension in (".yml", ".yaml"):
+            issues = yaml.safe_load(file) or []
+            if isinstance(issues, dict):
+                issues = issues.get("issues", [])
+        elif extension == ".csv":
+            issues = list(csv.DictReader(file))
+        elif extension == ".jsonl":
+            issues = [json.loads(line) for line in file if line.strip()]
+        else:
+            raise ValueError("expected a .yml, .csv or .jsonl file")
+
+    parsed = []
+    for issue in issues:
+        if not issue.get("title"):
+            raise ValueError("every issue needs a title")
+
+        parsed.append(
+            {
+                "title": str(issue["title"]),
+                "body": str(issue.get("body") or ""),
+                "labels": split_list(issue.get("labels")),
+                "assignees": split_list(issue.get("assignees")),
+            }
+        )
+    return parsed
+
+
+def split_list(value) -> list[str]:
+    """
+    Normalizes a list or comma-separated string into a list of non-empty strings.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def get_issue_key(issue: dict) -> str:
+    """
+    Identifies an issue by its content, so checkpoints survive reordering the file.
+    """
+    return hashlib.sha256(json.dumps(issue, sort_keys=True).encode()).hexdigest()
+
+
+def get_checkpoint_path(path: str) -> str:
+    """
+    Gets the checkpoint file for an issues file, stored in the app dir.
+    """
+    digest = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:16]
+    return os.path.join(CHECKPOINT_DIR, f"issues-{digest}.json")
+
+
+def read_checkpoint(checkpoint_path: str) -> dict[str, str]:
+    """
+    Reads the issues already created, keyed by issue key.
+    """
+    try:
+        with open(checkpoint_path, "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_checkpoint(checkpoint_path: str, checkpoint: dict[str, str]):
+    """
+    Atomically writes the issues already created.
+    """
+    os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", dir=os.path.dirname(checkpoint_path), suffix=".tmp", delete=False
+    ) as file:
+        json.dump(checkpoint, file)
+    os.replace(file.name, checkpoint_path)
+
+
 def get_issue_prompt(title: str, body: str) -> list[dict]:
     return [
         {
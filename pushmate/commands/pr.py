@@ -1,44 +1,75 @@
 import inquirer
+import threading
 import typer
 
-from rich import print
+from concurrent.futures import ThreadPoolExecutor
 from rich.console import Console
-from rich.markdown import Markdown
 from rich.prompt import Prompt
 
+from pushmate.commands.config import Config
 from pushmate.clients.git import GitClient, GitTarget
-from pushmate.clients.github import create_pr
+from pushmate.clients.github import create_pr, find_pr, update_pr
 from pushmate.clients.llm_client import LLMClient
+from pushmate.utils.compaction import chunk_diff, compact_diff
+from pushmate.utils.conversation import REFINEMENT_BUDGET_SHARE, Conversation
 from pushmate.utils.editor import edit_text
 from pushmate.utils.messages import (
     get_prompt,
     get_status,
     print_abort,
     print_error,
+    print_info,
+    print_message,
+    print_stream,
     print_success,
 )
+from pushmate.utils.profile import timed
+from pushmate.utils.stats import set_context
+from pushmate.utils.tokens import count_tokens
+from pushmate.utils.utils import parse_pr_marker
 
 console = Console()
 
 
-def run_pr(branch: str):
-    git_client = GitClient(GitTarget.PR)
+@timed("pm pr", "command")
+def run_pr(branch: str, refresh: bool = False):
+    git_client = GitClient(GitTarget.PR, refresh)
     with console.status(get_status("retrieving changed files")):
         invalid_files = git_client.get_diff_files(branch)
 
     if not git_client.valid_files:
         raise typer.Exit()
 
-    for filename, changes in invalid_files:
+    set_context(diff_size=git_client.diff_index.count_changes())
+    llm_client = LLMClient()
+    token_budget = int(Config().get_option("token_budget"))
+
+    # Generate for the files accepted so far while the user decides on the others
+    speculation = None
+    speculated_files = list(git_client.valid_files)
+    if invalid_files and llm_client.status:
+        speculation = threading.Thread(
+            target=speculate,
+            args=(git_client, speculated_files, token_budget),
+            daemon=True,
+        )
+        speculation.start()
+
+    for file in invalid_files:
         confirmation = Prompt.ask(
             get_prompt(
-                f"file {filename} has {changes} changes: include in commit message?"
+                f"file {file.path} has {file.changes} changes: include in commit message?"
             ),
             choices=["y", "N"],
             default="N",
         )
         if confirmation.lower() == "y":
-            git_client.valid_files.append(filename)
+            git_client.valid_files.append(file.path)
+
+    # With no files added, the speculative message is the one the loop would generate
+    if speculation and git_client.valid_files == speculated_files:
+        with console.status(get_status("generating pull request message")):
+            speculation.join()
 
     with console.status(get_status("analyzing changed files")):
         diff_output = git_client.get_diffs(branch)
@@ -50,13 +81,50 @@ def run_pr(branch: str):
         print_error("could not analyze changed files")
         raise typer.Exit()
 
-    llm_client = LLMClient()
+    summarized = count_tokens(diff_output, llm_client.model) > token_budget
+    if summarized:
+        # Too large for a single prompt: summarize chunks concurrently, then reduce
+        with console.status(get_status("summarizing changed files")):
+            diff_output = summarize_changes(
+                git_client, llm_client, token_budget, git_client.valid_files
+            )
+        if not diff_output:
+            print_error("unable to summarize changed files")
+            raise typer.Exit()
+        print_success("changed files summarized")
     generation = "generating"
     message = None
-    conversation = get_pr_prompt(diff_output)
+    # Refinement turns send the chunk summaries or a smaller compaction of the changes
+    # instead of the full diff
+    conversation = Conversation(
+        get_pr_prompt(diff_output),
+        lambda: (
+            diff_output
+            if summarized
+            else compact_diff(
+                git_client.diff_index,
+                git_client.valid_files,
+                int(token_budget * REFINEMENT_BUDGET_SHARE),
+                llm_client.model,
+            )[0]
+        ),
+    )
+    candidates = []
     while not message:
-        with console.status(get_status(f"{generation} pull request message")):
-            message = llm_client.prompt(conversation)
+        # Show the next candidate from the last request before asking the LLM again
+        if candidates:
+            message = candidates.pop(0)
+            print_message(message)
+        else:
+            message = print_stream(
+                llm_client.prompt(
+                    conversation.messages(),
+                    stream=True,
+                    cache=generation != "regenerating",
+                ),
+                get_status(f"{generation} pull request message"),
+            )
+            candidates = llm_client.candidates
 
         if message:
             print_success("pull request message generated")
@@ -64,7 +132,6 @@ def run_pr(branch: str):
             print_error("unable to generate pull request message")
             raise typer.Exit()
 
-        print(Markdown(f"```md\n{message}\n```"))
         confirmation = inquirer.prompt(
             [
                 inquirer.List(
@@ -86,21 +153,21 @@ def run_pr(branch: str):
             raise typer.Exit()
 
         elif confirmation.lower() == "regenerate pull request message":
-            conversation.append(
-                {
-                    "role": "user",
-                    "content": "Edit this pull request message for clarity and concision.",
-                }
-            )
+            if not candidates:
+                conversation.refine(
+                    message,
+                    "Edit this pull request message for clarity and concision.",
+                )
+                generation = "regenerating"
             message = None
-            generation = "regenerating"
 
         elif confirmation.lower() == "edit pull request message":
             message = edit_text(message)
 
         elif confirmation.lower() == "instruct llm on improvements":
             feedback = Prompt.ask(get_prompt("feedback"))
-            conversation.append({"role": "user", "content": feedback})
+            conversation.refine(message, feedback)
+            candidates = []
             message = None
             generation = "regenerating with feedback"
 
@@ -128,6 +195,255 @@ def run_pr(branch: str):
         raise typer.Exit()
 
 
+@timed("pm pr --update", "command")
+def run_pr_update(refresh: bool = False):
+    """
+    Updates the description of the current branch's open pull request with the commits
+    pushed since it was generated.
+
+    The commit a description covers up to is recorded in a hidden marker in its body, so
+    only the changes after it are sent to the LLM along with the current description.
+    Without a usable marker (pull requests not created by PushMate, or history rewritten
+    since), the changes are diffed against the base branch instead.
+    """
+    git_client = GitClient(GitTarget.PR_UPDATE, refresh)
+    with console.status(get_status("finding pull request")):
+        pr = find_pr()
+
+    if not pr:
+        print_error(
+            f"no open pull request found for branch {git_client.repo_info.current_branch}"
+        )
+        raise typer.Exit()
+
+    description, base = parse_pr_marker(pr.get("body"))
+    head = git_client.backend.resolve("HEAD")
+    if base == head:
+        print_info("pull request description is already up to date")
+        raise typer.Exit()
+
+    if not base or not git_client.is_ancestor(base):
+        base = f"origin/{pr['base']['ref']}"
+        print_info(f"describing every change since [bold]{base}[/bold]")
+
+    with console.status(get_status("retrieving changed files")):
+        invalid_files = git_client.get_diff_files(base)
+
+    if not git_client.valid_files:
+        raise typer.Exit()
+
+    set_context(diff_size=git_client.diff_index.count_changes())
+    llm_client = LLMClient()
+    token_budget = int(Config().get_option("token_budget"))
+
+    for file in invalid_files:
+        confirmation = Prompt.ask(
+            get_prompt(
+                f"file {file.path} has {file.changes} changes: include in pull request message?"
+            ),
+            choices=["y", "N"],
+            default="N",
+        )
+        if confirmation.lower() == "y":
+            git_client.valid_files.append(file.path)
+
+    with console.status(get_status("analyzing changed files")):
+        diff_output = git_client.get_diffs(base)
+
+    if diff_output:
+        print_success("changed files analyzed")
+    else:
+        print_error("could not analyze changed files")
+        raise typer.Exit()
+
+    summarized = count_tokens(diff_output, llm_client.model) > token_budget
+    if summarized:
+        with console.status(get_status("summarizing changed files")):
+            diff_output = summarize_changes(
+                git_client, llm_client, token_budget, git_client.valid_files
+            )
+        if not diff_output:
+            print_error("unable to summarize changed files")
+            raise typer.Exit()
+        print_success("changed files summarized")
+    generation = "updating"
+    message = None
+    conversation = Conversation(
+        get_pr_update_prompt(
+            f"Title: {pr['title']}\n{description}",
+            git_client.get_commit_subjects(base),
+            diff_output,
+        ),
+        lambda: (
+            diff_output
+            if summarized
+            else compact_diff(
+                git_client.diff_index,
+                git_client.valid_files,
+                int(token_budget * REFINEMENT_BUDGET_SHARE),
+                llm_client.model,
+            )[0]
+        ),
+    )
+    candidates = []
+    while not message:
+        # Show the next candidate from the last request before asking the LLM again
+        if candidates:
+            message = candidates.pop(0)
+            print_message(message)
+        else:
+            message = print_stream(
+                llm_client.prompt(
+                    conversation.messages(),
+                    stream=True,
+                    cache=generation != "regenerating",
+                ),
+                get_status(f"{generation} pull request message"),
+            )
+            candidates = llm_client.candidates
+
+        if message:
+            print_success("pull request message updated")
+        else:
+            print_error("unable to update pull request message")
+            raise typer.Exit()
+
+        confirmation = inquirer.prompt(
+            [
+                inquirer.List(
+                    "action",
+                    message="update the pull request with this message?",
+                    choices=[
+                        "update pull request",
+                        "edit pull request message",
+                        "instruct llm on improvements",
+                        "regenerate pull request message",
+                        "abort",
+                    ],
+                ),
+            ]
+        )["action"]
+
+        if confirmation.lower() == "abort":
+            print_abort("update aborted")
+            raise typer.Exit()
+
+        elif confirmation.lower() == "regenerate pull request message":
+            if not candidates:
+                conversation.refine(
+                    message,
+                    "Edit this pull request message for clarity and concision.",
+                )
+                generation = "regenerating"
+            message = None
+
+        elif confirmation.lower() == "edit pull request message":
+            message = edit_text(message)
+
+        elif confirmation.lower() == "instruct llm on improvements":
+            feedback = Prompt.ask(get_prompt("feedback"))
+            conversation.refine(message, feedback)
+            candidates = []
+            message = None
+            generation = "regenerating with feedback"
+
+    push_status = GitClient.push_changes()
+
+    if push_status:
+        print_success("pushed committed changes")
+    else:
+        print_error("could not push committed changes")
+        raise typer.Exit()
+
+    with console.status(get_status("updating pull request")):
+        pr_link = update_pr(pr["number"], message, head)
+
+    if pr_link:
+        print_success("pull request updated")
+        typer.launch(pr_link)
+    else:
+        print_error()
+        raise typer.Exit()
+
+
+def speculate(
+    git_client: GitClient,
+    paths: list[str],
+    token_budget: int,
+):
+    """
+    Generates a pull request message in the background for the given files.
+
+    The result is not returned: it is stored in the response cache, so the review loop
+    picks it up instantly if it ends up prompting with the same files. A separate
+    LLMClient is used so the review loop's client state is never shared.
+    """
+    try:
+        llm_client = LLMClient()
+        diff_output = git_client.diff_index.get_diffs(paths)
+        if count_tokens(diff_output, llm_client.model) > token_budget:
+            diff_output = summarize_changes(git_client, llm_client, token_budget, paths)
+            if not diff_output:
+                return
+
+        for _ in llm_client.prompt(get_pr_prompt(diff_output), stream=True):
+            pass
+    except Exception:
+        # Speculation is best effort; the review loop generates the message if needed
+        pass
+
+
+@timed("summarize chunks", "llm")
+def summarize_changes(
+    git_client: GitClient,
+    llm_client: LLMClient,
+    token_budget: int,
+    paths: list[str],
+) -> str:
+    """
+    Summarizes a diff that does not fit in a single prompt.
+
+    The changed files are split into chunks that each fit the token budget, and the
+    chunks are summarized concurrently. The wall-clock time is that of the largest
+    chunk rather than of the whole diff.
+
+    Args:
+        paths (list[str]): The changed files to summarize.
+
+    Returns:
+        The concatenated chunk summaries, or an empty string if any chunk failed.
+    """
+    chunks = chunk_diff(git_client.diff_index, paths, token_budget, llm_client.model)
+
+    def summarize(paths: list[str]) -> str:
+        diff_output, _ = compact_diff(
+            git_client.diff_index, paths, token_budget, llm_client.model
+        )
+        return llm_client.prompt(get_chunk_prompt(diff_output))
+
+    with ThreadPoolExecutor(
+        max_workers=int(Config().get_option("concurrency"))
+    ) as executor:
+        summaries = list(executor.map(summarize, chunks))
+
+    if not all(summaries):
+        return ""
+    return "\n\n".join(summaries)
+
+
+def get_chunk_prompt(diff_output: str) -> list[dict[str, str]]:
+    """
+    Generate a prompt to summarize one chunk of a large pull request.
+    """
+    return [
+        {
+            "role": "system",
+            "content": "You are a helpful assistant that summarizes part of the changes in a repository branch. The summary will be combined with summaries of the other changes to write a pull request. Return a concise bulleted list of the significant changes, naming the files or modules involved. Skip minor changes.",
+        },
+        {"role": "user", "content": f"{diff_output}"},
+    ]
+
+
 def get_pr_prompt(diff_output: str):
     """
     Generate a pull request prompt based on the given diff output.
@@ -160,3 +476,26 @@ def get_pr_prompt(diff_output: str):
                     """,
         },
     ]
+
+
+def get_pr_update_prompt(
+    description: str, commits: list[str], diff_output: str
+) -> list[dict[str, str]]:
+    """
+    Generate a prompt to merge new changes into an existing pull request description.
+
+    Args:
+        description (str): The current pull request message, starting with its title line.
+        commits (list[str]): The subjects of the new commits.
+        diff_output (str): The changes of the new commits.
+    """
+    commit_list = "\n".join(f"- {subject}" for subject in commits)
+    return [
+        {
+            "role": "system",
+            "content": "You are a helpful assistant that keeps pull request descriptions up to date. You are given the current description of a pull request and the changes of the commits pushed since it was written. Merge the significant new changes into the description: keep the content that is still accurate, add the new changes to the summary and the key changes, and only revise the title if the new changes alter the scope of the pull request. Keep the format of the current description, starting with a 'Title: ' line. Only return the updated description with no additional information.",
+        },
+        {"role": "user", "content": f"Current description:\n\n{description}"},
+        {"role": "user", "content": f"New commits:\n\n{commit_list}"},
+        {"role": "user", "content": f"{diff_output}"},
+    ]
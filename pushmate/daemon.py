@@ -0,0 +1,443 @@
+"""
+Optional background daemon that keeps PushMate warm between invocations.
+
+The daemon imports every command module once, and keeps the pooled OpenAI and GitHub
+connections, the parsed configuration and per-repository git state alive between
+commands. The `pm` entry point forwards commands to it over a Unix socket, passing the
+terminal's file descriptors and environment so prompts, editors, live output and
+credentials work as they do in-process. Commands run one at a time: while one runs,
+other clients are told the daemon is busy and run their command in-process.
+
+This module only imports the standard library at load time, so forwarding a command
+costs a socket round trip instead of importing typer, rich and openai.
+"""
+
+import json
+import os
+import queue
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+from typing import BinaryIO, Optional
+
+# Seconds to wait for a newly started daemon to accept connections
+START_TIMEOUT = 10.0
+
+# Seconds to wait for the daemon to take a command before running it in-process
+ACCEPT_TIMEOUT = 2.0
+
+
+def get_app_dir() -> str:
+    """
+    Gets the PushMate app directory without importing typer.
+
+    Mirrors `typer.get_app_dir("pushmate")` on the platforms with Unix sockets.
+    """
+    if sys.platform == "darwin":
+        return os.path.join(
+            os.path.expanduser("~/Library/Application Support"), "pushmate"
+        )
+    return os.path.join(
+        os.environ.get("XDG_CONFIG_HOME", os.path.expanduser("~/.config")), "pushmate"
+    )
+
+
+def get_socket_path() -> str:
+    return os.path.join(get_app_dir(), "daemon.sock")
+
+
+def connect() -> Optional[socket.socket]:
+    """
+    Connects to the daemon.
+
+    Returns:
+        The connected socket, or None if the daemon is not running.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(get_socket_path())
+        return sock
+    except OSError:
+        sock.close()
+        return None
+
+
+def send_request(sock: socket.socket, request: dict, fds: list[int] = None):
+    data = json.dumps(request).encode() + b"\n"
+    if fds:
+        socket.send_fds(sock, [data], fds)
+    else:
+        sock.sendall(data)
+
+
+def read_response(reader: BinaryIO) -> dict:
+    """
+    Reads one response line.
+
+    Args:
+        reader (BinaryIO): The reader of the connection, created once with
+            `sock.makefile("rb")` and reused for every line: a reader buffers what it
+            receives, which may include the following lines.
+    """
+    line = reader.readline()
+    return json.loads(line) if line else {}
+
+
+def forward(argv: list[str]) -> Optional[int]:
+    """
+    Runs a command in the daemon, attached to this process's terminal.
+
+    Commands are only forwarded from an interactive terminal, and never for `pm daemon`
+    itself or shell completion. If the daemon is busy with another command or does not
+    take the command within `ACCEPT_TIMEOUT` seconds, it runs in-process.
+
+    Returns:
+        The exit code of the command, or None if it should run in-process instead.
+    """
+    if argv[:1] == ["daemon"] or os.environ.get("PUSHMATE_NO_DAEMON"):
+        return None
+    if any(key.endswith("_COMPLETE") for key in os.environ):
+        return None
+    if not (sys.stdin.isatty() and sys.stdout.isatty()):
+        return None
+
+    sock = connect()
+    if sock is None:
+        return None
+
+    with sock, sock.makefile("rb") as reader:
+        try:
+            sock.settimeout(ACCEPT_TIMEOUT)
+            send_request(
+                sock,
+                {
+                    "command": "run",
+                    "argv": argv,
+                    "cwd": os.getcwd(),
+                    "env": dict(os.environ),
+                },
+                [0, 1, 2],
+            )
+            if not read_response(reader).get("accepted"):
+                return None
+            sock.settimeout(None)
+        except (OSError, ValueError):
+            return None
+
+        while True:
+            try:
+                response = read_response(reader)
+                break
+            except KeyboardInterrupt:
+                # Forward Ctrl+C to the command and wait for it to exit
+                try:
+                    sock.sendall(b"interrupt\n")
+                except OSError:
+                    return 130
+
+    return response.get("exit_code", 1)
+
+
+def get_status() -> Optional[dict]:
+    """
+    Gets the status of the running daemon, or None if it is not running.
+    """
+    sock = connect()
+    if sock is None:
+        return None
+    with sock, sock.makefile("rb") as reader:
+        try:
+            send_request(sock, {"command": "status"})
+            return read_response(reader) or None
+        except OSError:
+            return None
+
+
+def start() -> Optional[dict]:
+    """
+    Starts the daemon in the background, unless it is already running.
+
+    Returns:
+        The status of the daemon, or None if it did not start.
+    """
+    status = get_status()
+    if status:
+        return status
+
+    subprocess.Popen(
+        [sys.executable, "-m", "pushmate.daemon"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        status = get_status()
+        if status:
+            return status
+        time.sleep(0.05)
+    return None
+
+
+def stop() -> bool:
+    """
+    Stops the running daemon.
+
+    Returns:
+        Whether a daemon was running.
+    """
+    sock = connect()
+    if sock is None:
+        return False
+    with sock, sock.makefile("rb") as reader:
+        try:
+            send_request(sock, {"command": "stop"})
+            read_response(reader)
+        except OSError:
+            pass
+    return True
+
+
+class Daemon:
+    """
+    Serves commands forwarded by `pm` until stopped.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.commands = 0
+        # Held while a command is queued or running
+        self.busy = threading.Lock()
+        # Commands handed from the accepting thread to the main thread, None to stop
+        self.queue = queue.Queue()
+
+    def serve(self):
+        # Forwarded commands always write to the client's terminal, but the modules
+        # below create their consoles while the daemon's output goes to /dev/null
+        os.environ.setdefault("FORCE_COLOR", "1")
+        self.preload()
+
+        socket_path = get_socket_path()
+        os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            server.bind(socket_path)
+        finally:
+            os.umask(old_umask)
+        server.listen()
+        signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+        # Interrupts are only acted on while a command runs (see `run`)
+        signal.signal(signal.SIGINT, lambda *args: None)
+
+        # Commands run on the main thread, where interrupts are delivered, while
+        # connections are accepted on another so clients are never left waiting
+        threading.Thread(target=self.accept, args=(server,), daemon=True).start()
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                conn, request, fds = item
+                with conn:
+                    try:
+                        # The client runs the command in-process if it gave up waiting
+                        send_request(conn, {"accepted": True})
+                        exit_code = self.run(conn, request, fds)
+                        send_request(conn, {"exit_code": exit_code})
+                    except (OSError, ValueError):
+                        # The client went away; keep serving others
+                        pass
+                    finally:
+                        for fd in fds:
+                            os.close(fd)
+                        self.busy.release()
+        finally:
+            server.close()
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
+    def preload(self):
+        """
+        Imports the command modules and their dependencies, and loads the configuration.
+        """
+        import pushmate.commands.commit
+        import pushmate.commands.issue
+        import pushmate.commands.pr
+        import pushmate.main
+        import rich.markdown
+
+        from pushmate.commands.config import Config
+
+        Config().read_config()
+
+    def accept(self, server: socket.socket):
+        while True:
+            conn, _ = server.accept()
+            try:
+                handed_over = self.handle(conn)
+            except (OSError, ValueError):
+                # The client went away; keep serving others
+                handed_over = False
+            if not handed_over:
+                conn.close()
+
+    def handle(self, conn: socket.socket) -> bool:
+        """
+        Answers a request, or queues a command to run on the main thread.
+
+        Returns:
+            Whether the connection was handed to the main thread, which closes it.
+        """
+        # A client that connects without sending a request must not block the others
+        conn.settimeout(ACCEPT_TIMEOUT)
+        data, fds, _, _ = socket.recv_fds(conn, 65536, 3)
+        try:
+            while data and not data.endswith(b"\n"):
+                chunk = conn.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+            request = json.loads(data)
+            conn.settimeout(None)
+
+            match request.get("command"):
+                case "run" if len(fds) == 3:
+                    if not self.busy.acquire(blocking=False):
+                        send_request(conn, {"busy": True})
+                        return False
+                    self.queue.put((conn, request, fds))
+                    fds = []
+                    return True
+                case "status":
+                    send_request(
+                        conn,
+                        {
+                            "pid": os.getpid(),
+                            "uptime": time.time() - self.started,
+                            "commands": self.commands,
+                        },
+                    )
+                case "stop":
+                    # A running command finishes first
+                    self.queue.put(None)
+                    send_request(conn, {})
+                case _:
+                    send_request(conn, {"error": "invalid request"})
+            return False
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+    def run(self, conn: socket.socket, request: dict, fds: list[int]) -> int:
+        """
+        Runs a command with the client's terminal, working directory and environment.
+
+        Returns:
+            The exit code of the command.
+        """
+        from pushmate.clients.git import reset_repo_state
+        from pushmate.main import app
+        from pushmate.utils.profile import profiler
+
+        self.commands += 1
+        # Branches may have been switched or the config edited since the last command
+        reset_repo_state()
+        profiler.disable()
+        profiler.restart()
+
+        saved_fds = [os.dup(fd) for fd in (0, 1, 2)]
+        saved_streams = sys.stdin, sys.stdout, sys.stderr
+        saved_cwd = os.getcwd()
+        saved_env = dict(os.environ)
+
+        finished = threading.Event()
+        main_thread = threading.main_thread().ident
+        reader = conn.makefile("rb")
+
+        def watch():
+            # An interrupt from the client, or the client going away, stops the command
+            try:
+                reader.readline()
+            except OSError:
+                pass
+            if not finished.is_set():
+                signal.pthread_kill(main_thread, signal.SIGINT)
+
+        def interrupt(*args):
+            # Ignore an interrupt that arrives after the command finished
+            if not finished.is_set():
+                raise KeyboardInterrupt
+
+        for fd, client_fd in enumerate(fds):
+            os.dup2(client_fd, fd)
+        sys.stdin = open(0, "r", closefd=False)
+        sys.stdout = open(1, "w", buffering=1, closefd=False)
+        sys.stderr = open(2, "w", buffering=1, closefd=False)
+        # The whole environment of the client, e.g. PATH, SSH_AUTH_SOCK, GIT_* and proxies
+        os.environ.clear()
+        os.environ.update(request.get("env", {}))
+        os.environ.setdefault("FORCE_COLOR", "1")
+        os.chdir(request["cwd"])
+        saved_handler = signal.signal(signal.SIGINT, interrupt)
+        threading.Thread(target=watch, daemon=True).start()
+
+        exit_code = 0
+        try:
+            app(args=request["argv"], prog_name="pm")
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else int(bool(e.code))
+        except KeyboardInterrupt:
+            exit_code = 130
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            finished.set()
+            signal.signal(signal.SIGINT, saved_handler)
+            # Closed before the daemon's file descriptors are restored, so output that
+            # could not be written to a client that went away is dropped
+            client_streams = sys.stdin, sys.stdout, sys.stderr
+            sys.stdin, sys.stdout, sys.stderr = saved_streams
+            for stream in client_streams:
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+            for fd, saved_fd in enumerate(saved_fds):
+                os.dup2(saved_fd, fd)
+                os.close(saved_fd)
+            os.environ.clear()
+            os.environ.update(saved_env)
+            os.chdir(saved_cwd)
+
+        return exit_code
+
+
+def main():
+    """
+    Entry point of `pm`: forwards the command to the daemon when it is running,
+    otherwise runs it in-process.
+    """
+    exit_code = forward(sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
+
+    from pushmate.main import app
+
+    app()
+
+
+if __name__ == "__main__":
+    Daemon().serve()
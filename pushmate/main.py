@@ -1,29 +1,67 @@
+import time
 import typer
 
+from enum import Enum
 from rich.console import Console
 from rich.table import Table
 from typing import Annotated, Optional
 
-from pushmate.commands.commit import run_commit
-from pushmate.commands.issue import run_issue
-from pushmate.commands.pr import run_pr
-from pushmate.commands.config import Config
 from pushmate.utils.messages import (
     print_abort,
+    print_error,
     print_info,
     print_info,
     print_success,
 )
 
+# Command modules are imported inside each command so that `pm --help` and shell
+# completion do not pay for importing openai, requests, inquirer and yaml.
 app = typer.Typer(no_args_is_help=True, rich_markup_mode="rich")
 console = Console()
 
 
 @app.callback()
-def callback():
+def callback(
+    ctx: typer.Context,
+    profile: Annotated[
+        bool,
+        typer.Option(
+            help="Print how long each stage (git, LLM, GitHub) of the command took.",
+            show_default=False,
+        ),
+    ] = False,
+    trace_file: Annotated[
+        Optional[str],
+        typer.Option(
+            help="Write the timed stages to a file in Chrome trace format (chrome://tracing, Perfetto).",
+            show_default=False,
+        ),
+    ] = None,
+):
     """
     PushMate: automate your git workflow with AI.
     """
+    from pushmate.utils.stats import set_context
+
+    # Recorded with each LLM and GitHub call, see `pm stats`
+    set_context(command=ctx.invoked_subcommand or "", repo=None, diff_size=0)
+
+    if not profile and not trace_file:
+        return
+
+    from pushmate.utils.profile import print_profile, profiler
+
+    profiler.enable()
+
+    # Report once the command finishes, including when it exits early
+    def report():
+        if profile:
+            print_profile()
+        if trace_file:
+            profiler.write_trace(trace_file)
+            print_info(f"wrote trace to [bold]{trace_file}[/bold]")
+
+    ctx.call_on_close(report)
 
 
 @app.command()
@@ -35,11 +73,25 @@ def commit(
             show_default=False,
         ),
     ] = 0,
+    repos: Annotated[
+        Optional[str],
+        typer.Option(
+            help="Comma-separated repository paths or glob patterns to commit in concurrently, e.g. 'services/*'.",
+            show_default=False,
+        ),
+    ] = None,
 ):
     """
     Automatically generate a git commit based on the currently staged changes.
     """
-    run_commit(max_chars)
+    if repos:
+        from pushmate.commands.commit import run_multi_commit
+
+        run_multi_commit(repos, max_chars)
+    else:
+        from pushmate.commands.commit import run_commit
+
+        run_commit(max_chars)
 
 
 @app.command()
@@ -52,19 +104,266 @@ def pr(
             rich_help_panel="Configuration",
         ),
     ] = "",
+    refresh: Annotated[
+        bool,
+        typer.Option(
+            help="Refresh cached repository information (e.g. the default branch) from the remote.",
+            show_default=False,
+            rich_help_panel="Configuration",
+        ),
+    ] = False,
+    update: Annotated[
+        bool,
+        typer.Option(
+            help="Update the description of the branch's open pull request with the commits added since it was generated.",
+            show_default=False,
+        ),
+    ] = False,
 ):
     """
     Automatically generate a GitHub pull request based on the currently branch's HEAD.
     """
-    run_pr(branch)
+    if update and branch:
+        # The base of an existing pull request is kept when its description is updated
+        print_abort("--branch cannot be used with --update")
+        raise typer.Exit()
+
+    if update:
+        from pushmate.commands.pr import run_pr_update
+
+        run_pr_update(refresh)
+    else:
+        from pushmate.commands.pr import run_pr
+
+        run_pr(branch, refresh)
 
 
 @app.command()
-def issue():
+def issue(
+    from_file: Annotated[
+        Optional[str],
+        typer.Option(
+            help="Create every issue listed in a YAML, CSV or JSONL file instead of prompting.",
+            show_default=False,
+        ),
+    ] = None,
+    summarize: Annotated[
+        bool,
+        typer.Option(
+            help="Summarize each issue description from --from-file with AI.",
+            show_default=False,
+        ),
+    ] = False,
+):
     """
     Automatically generate a GitHub issue based on user prompts.
     """
-    run_issue()
+    if from_file:
+        from pushmate.commands.issue import run_bulk_issue
+
+        run_bulk_issue(from_file, summarize)
+    else:
+        from pushmate.commands.issue import run_issue
+
+        run_issue()
+
+
+@app.command()
+def cache(
+    clear: Annotated[
+        bool,
+        typer.Option(
+            help="Remove every cached LLM response.",
+            show_default=False,
+        ),
+    ] = False,
+):
+    """
+    View or clear the cache of LLM responses.
+    """
+    from pushmate.commands.config import Config
+    from pushmate.utils.cache import ResponseCache
+
+    response_cache = ResponseCache(int(Config().get_option("cache_size")) * 1024**2)
+
+    if clear:
+        removed = response_cache.clear()
+        print_success(f"removed [bold]{removed}[/bold] cached responses")
+        raise typer.Exit()
+
+    entries = response_cache.entries()
+    total = sum(entry.size for entry in entries)
+    table = Table(
+        "key",
+        "model",
+        "size",
+        "last used",
+        title="cached llm responses",
+        caption=f"{len(entries)} entries using {total / 1024:.1f} of {response_cache.max_size / 1024:.0f} KB\n"
+        r"clear the cache with [bold]pm cache --clear[/bold]",
+    )
+    for entry in entries:
+        table.add_row(
+            entry.key[:12],
+            entry.model,
+            f"{entry.size / 1024:.1f} KB",
+            time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.last_used)),
+        )
+
+    console.rule(style="blue")
+    console.print(table)
+    console.rule(style="blue")
+
+
+@app.command()
+def stats(
+    days: Annotated[
+        int,
+        typer.Option(
+            help="# of days of calls to include. 0 includes every recorded call.",
+        ),
+    ] = 30,
+    clear: Annotated[
+        bool,
+        typer.Option(
+            help="Remove every recorded call.",
+            show_default=False,
+        ),
+    ] = False,
+):
+    """
+    View the latency, token usage and estimated cost of LLM and GitHub calls.
+    """
+    from pushmate.utils.stats import stats_store
+
+    if clear:
+        removed = stats_store.clear()
+        print_success(f"removed [bold]{removed}[/bold] recorded calls")
+        raise typer.Exit()
+
+    since = time.time() - days * 86400 if days > 0 else 0
+    period = f"last {days} days" if days > 0 else "all time"
+    console.rule(style="blue")
+    for group, title in [("command", "by command"), ("repo", "by repository")]:
+        summaries = stats_store.summarize(group, since)
+        if not summaries:
+            print_info(f"no calls recorded ({period})")
+            break
+
+        table = Table(
+            group.replace("repo", "repository"),
+            "service",
+            "calls",
+            "cached",
+            "p50 / p95 ms",
+            "tokens in / out",
+            "est. cost",
+            title=f"calls {title} ({period})",
+            caption="latencies leave out cached responses",
+        )
+        for summary in summaries:
+            table.add_row(
+                summary.group,
+                summary.kind,
+                str(summary.calls),
+                str(summary.cache_hits),
+                f"{summary.p50 * 1000:.0f} / {summary.p95 * 1000:.0f}",
+                f"{summary.prompt_tokens} / {summary.completion_tokens}",
+                f"${summary.cost:.4f}",
+            )
+        console.print(table)
+    console.rule(style="blue")
+
+
+class DaemonAction(str, Enum):
+    START = "start"
+    STOP = "stop"
+    STATUS = "status"
+
+
+@app.command()
+def daemon(
+    action: Annotated[
+        DaemonAction,
+        typer.Argument(help="Start, stop or check on the daemon."),
+    ] = DaemonAction.STATUS,
+):
+    """
+    Run a background daemon that keeps PushMate warm, so commands start instantly.
+    """
+    from pushmate import daemon
+
+    match action:
+        case DaemonAction.START:
+            status = daemon.start()
+            if status:
+                print_success(f"daemon running with pid [bold]{status['pid']}[/bold]")
+            else:
+                print_error("could not start the daemon")
+                raise typer.Exit(1)
+        case DaemonAction.STOP:
+            if daemon.stop():
+                print_success("daemon stopped")
+            else:
+                print_info("daemon is not running")
+        case DaemonAction.STATUS:
+            status = daemon.get_status()
+            if status:
+                print_info(
+                    f"daemon running with pid [bold]{status['pid']}[/bold] for "
+                    f"{status['uptime'] / 60:.0f} minutes, {status['commands']} commands served"
+                )
+            else:
+                print_info(
+                    r"daemon is not running, start it with [bold]pm daemon start[/bold]"
+                )
+
+
+hook_app = typer.Typer(no_args_is_help=True, rich_markup_mode="rich")
+app.add_typer(
+    hook_app,
+    name="hook",
+    help="Pre-generate commit messages in the background as changes are staged.",
+)
+
+
+@hook_app.command()
+def install():
+    """
+    Install git hooks that generate a commit message whenever the index changes, for
+    [bold]pm commit[/bold] and [bold]git commit[/bold] to use instantly.
+    """
+    from pushmate.commands.hook import run_install
+
+    run_install()
+
+
+@hook_app.command()
+def uninstall():
+    """
+    Remove the git hooks installed by [bold]pm hook install[/bold].
+    """
+    from pushmate.commands.hook import run_uninstall
+
+    run_uninstall()
+
+
+@hook_app.command("post-index-change", hidden=True)
+def post_index_change():
+    from pushmate.commands.hook import run_post_index_change
+
+    run_post_index_change()
+
+
+@hook_app.command("prepare-commit-msg", hidden=True)
+def prepare_commit_msg(
+    message_file: str,
+    source: Annotated[str, typer.Argument()] = "",
+    commit: Annotated[str, typer.Argument()] = "",
+):
+    from pushmate.commands.hook import run_prepare_commit_msg
+
+    run_prepare_commit_msg(message_file, source)
 
 
 @app.command()
@@ -114,13 +413,112 @@ def config(
             help="OpenAI API Key.", show_default=False, rich_help_panel="Configuration"
         ),
     ] = False,
+    timeout: Annotated[
+        bool,
+        typer.Option(
+            help="Seconds to wait for a response from the LLM provider or GitHub. (Default: 60)",
+            show_default=False,
+            rich_help_panel="Configuration",
+        ),
+    ] = False,
+    connect_timeout: Annotated[
+        bool,
+        typer.Option(
+            help="Seconds to wait when connecting to the LLM provider or GitHub. (Default: 10)",
+            show_default=False,
+            rich_help_panel="Configuration",
+        ),
+    ] = False,
+    max_retries: Annotated[
+        bool,
+        typer.Option(
+            help="Maximum # of retries for failed LLM or GitHub requests. (Default: 2)",
+            show_default=False,
+            rich_help_panel="Configuration",
+        ),
+    ] = False,
+    cache_size: Annotated[
+        bool,
+        typer.Option(
+            help="Maximum size of the LLM response cache in MB. (Default: 10)",
+            show_default=False,
+            rich_help_panel="Configuration",
+        ),
+    ] = False,
+    token_budget: Annotated[
+        bool,
+        typer.Option(
+            help="Maximum # of tokens of changes to send to the LLM. Larger diffs are compacted. (Default: 12000)",
+            show_default=False,
+            rich_help_panel="Configuration",
+        ),
+    ] = False,
+    concurrency: Annotated[
+        bool,
+        typer.Option(
+            help="Maximum # of concurrent LLM or GitHub requests for large pull requests and bulk issues. (Default: 4)",
+            show_default=False,
+            rich_help_panel="Configuration",
+        ),
+    ] = False,
+    candidates: Annotated[
+        bool,
+        typer.Option(
+            help="# of candidate messages to generate per request. Regenerating shows the next candidate without another request. (Default: 1)",
+            show_default=False,
+            rich_help_panel="Configuration",
+        ),
+    ] = False,
+    model: Annotated[
+        bool,
+        typer.Option(
+            help="Model for most prompts. Leave unset to use the provider's default (openai: gpt-4o-mini).",
+            show_default=False,
+            rich_help_panel="Configuration",
+        ),
+    ] = False,
+    large_model: Annotated[
+        bool,
+        typer.Option(
+            help="Larger-context model for prompts over the large model threshold. Leave unset to use the provider's default (openai: gpt-4.1-mini).",
+            show_default=False,
+            rich_help_panel="Configuration",
+        ),
+    ] = False,
+    large_model_threshold: Annotated[
+        bool,
+        typer.Option(
+            help="# of prompt tokens above which the large model is used. (Default: 8000)",
+            show_default=False,
+            rich_help_panel="Configuration",
+        ),
+    ] = False,
+    base_url: Annotated[
+        bool,
+        typer.Option(
+            help="API endpoint of the provider, e.g. http://localhost:11434/v1 for a local OpenAI-compatible server.",
+            show_default=False,
+            rich_help_panel="Configuration",
+        ),
+    ] = False,
+    ignore: Annotated[
+        bool,
+        typer.Option(
+            help="Comma-separated gitignore-style patterns of files never sent to the LLM, added to the repository's .pushmateignore. (Default: common lockfiles)",
+            show_default=False,
+            rich_help_panel="Configuration",
+        ),
+    ] = False,
 ):
     """
     Set or view PushMate configuration options.
     """
-    config = Config()
     options = {k: v for k, v in locals().items() if v is True}
 
+    from pushmate.commands.config import Config
+
+    config = Config()
+
     # No options provided, print current configuration
     if not options:
         if value:
@@ -134,7 +532,7 @@ def config(
                 caption=r"update an option with [bold]pm config --\[option] \[value][/bold]",
             )
             for k, v in config.get_options().items():
-                table.add_row(k.replace("_", "-"), v)
+                table.add_row(k.replace("_", "-"), str(v))
 
             console.rule(style="blue")
             console.print(table)
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from typing import Optional
+
+from pushmate.commands.config import APP_DIR
+
+CACHE_DIR = os.path.join(APP_DIR, "cache")
+
+
+class CacheEntry:
+    key: str
+    provider: str
+    model: str
+    size: int
+    last_used: float
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of LLM responses, stored as one file per response.
+
+    Entries are keyed by a hash of the message list, provider and model. The file
+    mtime tracks when an entry was last used, and the least recently used entries
+    are evicted once the cache exceeds its maximum size.
+    """
+
+    def __init__(self, max_size: int, path: str = CACHE_DIR):
+        """
+        Args:
+            max_size (int): Maximum total size of the cache in bytes.
+            path (str): Directory to store the cache in.
+        """
+        self.max_size = max_size
+        self.path = path
+
+    @staticmethod
+    def get_key(
+        messages: list[dict[str, str]], provider: str, model: str, n: int = 1
+    ) -> str:
+        """
+        Hashes a prompt, and the # of candidates requested if more than one, into a cache key.
+        """
+        key = {"provider": provider, "model": model, "messages": messages}
+        if n > 1:
+            key["n"] = n
+        content = json.dumps(key, sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Retrieves a cached response and marks it as recently used.
+
+        Returns:
+            The cached response, or None if there is no entry for the key.
+        """
+        entry_path = os.path.join(self.path, f"{key}.json")
+        try:
+            with open(entry_path, "r") as file:
+                response = json.load(file)["response"]
+            os.utime(entry_path)
+            return response
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def set(self, key: str, provider: str, model: str, response: str):
+        """
+        Stores a response, evicting least recently used entries if the cache is full.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.path, suffix=".tmp", delete=False
+        ) as file:
+            json.dump(
+                {
+                    "provider": provider,
+                    "model": model,
+                    "created": time.time(),
+                    "response": response,
+                },
+                file,
+            )
+        os.replace(file.name, os.path.join(self.path, f"{key}.json"))
+        self.evict()
+
+    def entries(self) -> list[CacheEntry]:
+        """
+        Lists the cache entries, most recently used first.
+        """
+        entries = []
+        if not os.path.isdir(self.path):
+            return entries
+
+        for filename in os.listdir(self.path):
+            if not filename.endswith(".json"):
+                continue
+            entry_path = os.path.join(self.path, filename)
+            try:
+                stat = os.stat(entry_path)
+                with open(entry_path, "r") as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+
+            entry = CacheEntry()
+            entry.key = filename.removesuffix(".json")
+            entry.provider = data.get("provider", "")
+            entry.model = data.get("model", "")
+            entry.size = stat.st_size
+            entry.last_used = stat.st_mtime
+            entries.append(entry)
+
+        return sorted(entries, key=lambda entry: entry.last_used, reverse=True)
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits within its maximum size.
+        """
+        files = []
+        for filename in os.listdir(self.path):
+            if filename.endswith(".json"):
+                stat = os.stat(os.path.join(self.path, filename))
+                files.append((stat.st_mtime, stat.st_size, filename))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, filename in sorted(files):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.path, filename))
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self) -> int:
+        """
+        Removes every entry from the cache.
+
+        Returns:
+            The number of entries removed.
+        """
+        removed = 0
+        if not os.path.isdir(self.path):
+            return removed
+
+        for filename in os.listdir(self.path):
+            if filename.endswith(".json"):
+                os.remove(os.path.join(self.path, filename))
+                removed += 1
+        return removed
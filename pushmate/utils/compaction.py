@@ -0,0 +1,238 @@
+import os
+
+from collections import Counter
+
+from pushmate.utils.diff import DiffFile, DiffIndex
+from pushmate.utils.profile import timed
+from pushmate.utils.tokens import count_tokens
+
+# Context lines kept around each change when reducing context
+REDUCED_CONTEXT = 1
+
+# Minimum # of changed lines for a hunk to be considered moved code
+MIN_MOVED_LINES = 3
+
+
+class CompactFile:
+    """
+    A file diff split into its header and hunks, so hunks can be compacted individually.
+    """
+
+    file: DiffFile
+    header: str
+    hunks: list[str]
+
+    def __init__(self, diff_index: DiffIndex, file: DiffFile):
+        self.file = file
+        buffer = diff_index.buffer
+        if not file.hunks:
+            self.header = buffer[file.start : file.end]
+            self.hunks = []
+            return
+
+        self.header = buffer[file.start : file.hunks[0]]
+        bounds = file.hunks + [file.end]
+        self.hunks = [buffer[bounds[i] : bounds[i + 1]] for i in range(len(file.hunks))]
+
+    def text(self) -> str:
+        return self.header + "".join(self.hunks)
+
+
+@timed("compact diff", "prompt")
+def compact_diff(
+    diff_index: DiffIndex, paths: list[str], budget: int, model: str
+) -> tuple[str, list[str]]:
+    """
+    Compacts the diffs of the given files to fit within a token budget.
+
+    Stages are applied in order of increasing information loss, stopping as soon as
+    the diff fits: collapsing whitespace-only hunks, collapsing moved code, reducing
+    context lines and finally replacing the largest files with a stat summary.
+
+    Args:
+        diff_index (DiffIndex): The index holding the loaded diffs.
+        paths (list[str]): The files to include.
+        budget (int): Maximum # of tokens for the diff.
+        model (str): The model used to count tokens.
+
+    Returns:
+        A tuple of the compacted diff and a list of notes describing what was dropped.
+    """
+    files = [
+        CompactFile(diff_index, diff_index.get(path))
+        for path in paths
+        if diff_index.get(path) and diff_index.get(path).loaded
+    ]
+    tokens = {file.file.path: count_tokens(file.text(), model) for file in files}
+    notes = []
+
+    def fits() -> bool:
+        return sum(tokens.values()) <= budget
+
+    def recount(file: CompactFile):
+        tokens[file.file.path] = count_tokens(file.text(), model)
+
+    if fits():
+        return "".join(file.text() for file in files), notes
+
+    collapsed = 0
+    for file in files:
+        hunks = [collapse_whitespace(hunk) for hunk in file.hunks]
+        collapsed += sum(hunk != old for hunk, old in zip(hunks, file.hunks))
+        file.hunks = hunks
+        recount(file)
+    if collapsed:
+        notes.append(f"collapsed {collapsed} whitespace-only hunks")
+
+    if not fits():
+        moved = collapse_moves(files)
+        for file in files:
+            recount(file)
+        if moved:
+            notes.append(f"collapsed {moved} hunks of moved code")
+
+    if not fits():
+        for file in files:
+            file.hunks = [reduce_context(hunk) for hunk in file.hunks]
+            recount(file)
+        notes.append(f"reduced context to {REDUCED_CONTEXT} line around each change")
+
+    summarized = []
+    for file in sorted(files, key=lambda file: tokens[file.file.path], reverse=True):
+        if fits():
+            break
+        summarize(file)
+        recount(file)
+        summarized.append(file.file.path)
+    if summarized:
+        notes.append(f"summarized {len(summarized)} files: {', '.join(summarized)}")
+
+    return "".join(file.text() for file in files), notes
+
+
+def split_changes(hunk: str) -> tuple[str, list[str], list[str]]:
+    """
+    Splits a hunk into its "@@" line and its removed and added lines, without the prefix.
+    """
+    lines = hunk.splitlines(keepends=True)
+    removed = [line[1:] for line in lines[1:] if line.startswith("-")]
+    added = [line[1:] for line in lines[1:] if line.startswith("+")]
+    return lines[0], removed, added
+
+
+def collapse_whitespace(hunk: str) -> str:
+    """
+    Replaces a hunk that only changes whitespace with a one-line note.
+    """
+    header, removed, added = split_changes(hunk)
+    if not removed and not added:
+        return hunk
+    if "".join("".join(removed).split()) != "".join("".join(added).split()):
+        return hunk
+    return f"{header.rstrip()} whitespace-only changes omitted\n"
+
+
+def collapse_moves(files: list[CompactFile]) -> int:
+    """
+    Replaces hunks whose changes are moved code with a one-line note.
+
+    A hunk is moved code when every line it adds is removed by another hunk and every
+    line it removes is added by another hunk, anywhere in the diff.
+
+    Returns:
+        The number of collapsed hunks.
+    """
+    hunk_changes = []
+    all_removed = Counter()
+    all_added = Counter()
+    for file in files:
+        for hunk in file.hunks:
+            _, removed, added = split_changes(hunk)
+            removed = Counter(line.strip() for line in removed if line.strip())
+            added = Counter(line.strip() for line in added if line.strip())
+            hunk_changes.append((removed, added))
+            all_removed.update(removed)
+            all_added.update(added)
+
+    collapsed = 0
+    changes = iter(hunk_changes)
+    for file in files:
+        for i, hunk in enumerate(file.hunks):
+            removed, added = next(changes)
+            if sum(removed.values()) + sum(added.values()) < MIN_MOVED_LINES:
+                continue
+            other_removed = all_removed - removed
+            other_added = all_added - added
+            if all(other_removed[line] >= n for line, n in added.items()) and all(
+                other_added[line] >= n for line, n in removed.items()
+            ):
+                header = hunk.splitlines()[0]
+                file.hunks[i] = (
+                    f"{header} {sum(removed.values()) + sum(added.values())} "
+                    "lines of moved code omitted\n"
+                )
+                collapsed += 1
+
+    return collapsed
+
+
+def reduce_context(hunk: str, context: int = REDUCED_CONTEXT) -> str:
+    """
+    Drops context lines further than `context` lines away from any change.
+    """
+    lines = hunk.splitlines(keepends=True)
+    if len(lines) <= 1:
+        return hunk
+
+    body = lines[1:]
+    changed = [i for i, line in enumerate(body) if line[:1] in ("+", "-")]
+    keep = set()
+    for i in changed:
+        keep.update(range(i - context, i + context + 1))
+
+    reduced = [lines[0]]
+    for i, line in enumerate(body):
+        if i in keep or line[:1] not in (" ", ""):
+            reduced.append(line)
+    return "".join(reduced)
+
+
+def summarize(file: CompactFile):
+    """
+    Replaces a file diff with a stat summary.
+    """
+    header = file.header.splitlines(keepends=True)[0] if file.header else ""
+    file.header = (
+        f"{header}{file.file.path}: {file.file.added} additions, "
+        f"{file.file.removed} deletions (diff omitted to fit token budget)\n"
+    )
+    file.hunks = []
+
+
+def chunk_diff(
+    diff_index: DiffIndex, paths: list[str], budget: int, model: str
+) -> list[list[str]]:
+    """
+    Groups files into chunks of at most `budget` tokens each.
+
+    Files are ordered by directory so that related changes end up in the same chunk.
+    A single file larger than the budget gets a chunk of its own.
+
+    Returns:
+        A list of chunks, each a list of file paths.
+    """
+    chunks = []
+    chunk = []
+    chunk_tokens = 0
+    for path in sorted(paths, key=lambda path: (os.path.dirname(path), path)):
+        tokens = count_tokens(diff_index.get_diff(path), model)
+        if chunk and chunk_tokens + tokens > budget:
+            chunks.append(chunk)
+            chunk = []
+            chunk_tokens = 0
+        chunk.append(path)
+        chunk_tokens += tokens
+
+    if chunk:
+        chunks.append(chunk)
+    return chunks
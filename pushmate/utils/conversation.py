@@ -0,0 +1,70 @@
+from typing import Callable
+
+# Share of the token budget given to the changes in refinement turns
+REFINEMENT_BUDGET_SHARE = 0.25
+
+
+class Conversation:
+    """
+    The messages sent to the LLM while a generated message is reviewed and refined.
+
+    The first turn sends the full prompt. Refinement turns (regenerating or instructing
+    the LLM on improvements) send a compacted context instead: the prompt with its last
+    user message (the changes) condensed, the message being refined and the instruction.
+    """
+
+    prompt: list[dict[str, str]]
+    turns: list[tuple[str, str]]
+
+    def __init__(
+        self, prompt: list[dict[str, str]], get_context: Callable[[], str] = None
+    ):
+        """
+        Args:
+            prompt (list[dict[str, str]]): The system and user messages of the first turn.
+            get_context (Callable[[], str]): Builds the condensed changes that replace
+                the last user message of the prompt in refinement turns. Called once, on
+                the first refinement. Defaults to sending the prompt unchanged.
+        """
+        self.prompt = prompt
+        self.get_context = get_context
+        self.context = None
+        self.turns = []
+
+    def refine(self, message: str, instruction: str):
+        """
+        Records the message shown to the user and the instruction to improve it.
+
+        Args:
+            message (str): The assistant's reply, including any edits by the user.
+            instruction (str): What the next reply should improve.
+        """
+        self.turns.append((message, instruction))
+
+    def messages(self) -> list[dict[str, str]]:
+        """
+        Builds the messages to send for the current turn.
+        """
+        if not self.turns:
+            return self.prompt
+
+        prompt = self.prompt
+        if self.get_context:
+            if self.context is None:
+                self.context = self.get_context()
+            # Only the changes are condensed; instructions such as the character limit
+            # are kept
+            last = max(
+                i for i, message in enumerate(prompt) if message["role"] == "user"
+            )
+            prompt = (
+                prompt[:last]
+                + [{"role": "user", "content": self.context}]
+                + prompt[last + 1 :]
+            )
+
+        message, instruction = self.turns[-1]
+        return prompt + [
+            {"role": "assistant", "content": message},
+            {"role": "user", "content": instruction},
+        ]
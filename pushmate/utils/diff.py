@@ -0,0 +1,336 @@
+import os
+
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterator, Optional
+
+
+@dataclass
+class DiffFile:
+    """
+    A single changed file within a diff.
+    """
+
+    path: str
+    old_path: str
+    added: int
+    removed: int
+    binary: bool
+    start: int = 0
+    end: int = 0
+    hunks: list[int] = field(default_factory=list)
+    loaded: bool = False
+
+    @property
+    def changes(self) -> str:
+        """
+        Human readable number of changes, matching `git diff --stat`.
+        """
+        if self.binary:
+            return "binary"
+        return str(self.added + self.removed)
+
+
+class DiffIndex:
+    """
+    Index of a diff built from `git diff -z --numstat --patch` output.
+
+    Patch text of every loaded file is stored in one shared buffer, and each
+    `DiffFile` records its offsets (and the offsets of its hunks) into that buffer.
+    """
+
+    files: dict[str, DiffFile]
+    buffer: str
+
+    def __init__(self):
+        self.files = {}
+        self.buffer = ""
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __iter__(self) -> Iterator[DiffFile]:
+        return iter(self.files.values())
+
+    def count_changes(self) -> int:
+        """
+        Returns the total # of added and removed lines of the indexed files.
+        """
+        return sum(file.added + file.removed for file in self.files.values())
+
+    def get(self, path: str) -> Optional[DiffFile]:
+        return self.files.get(path)
+
+    def get_diff(self, path: str) -> str:
+        """
+        Returns the patch text of a single file, or an empty string if it was not loaded.
+        """
+        file = self.files.get(path)
+        if not file or not file.loaded:
+            return ""
+        return self.buffer[file.start : file.end]
+
+    def get_diffs(self, paths: list[str]) -> str:
+        """
+        Returns the concatenated patch text of the given files.
+        """
+        return "".join(self.get_diff(path) for path in paths)
+
+    def pathspecs(self, paths: list[str]) -> list[str]:
+        """
+        Returns the pathspecs needed to diff the given files, including the old path of renames.
+
+        Paths are relative to the root of the working tree and matched literally, so they
+        select the same files from any subdirectory and whatever characters they contain.
+        """
+        pathspecs = []
+        for path in paths:
+            file = self.files[path]
+            pathspecs.append(f":(top,literal){file.path}")
+            if file.old_path != file.path:
+                pathspecs.append(f":(top,literal){file.old_path}")
+        return pathspecs
+
+    def merge(self, other: "DiffIndex"):
+        """
+        Copies the loaded patches of another index into this one.
+        """
+        offset = len(self.buffer)
+        self.buffer += other.buffer
+        for path, file in other.files.items():
+            if not file.loaded:
+                continue
+            file.start += offset
+            file.end += offset
+            file.hunks = [hunk + offset for hunk in file.hunks]
+            self.files[path] = file
+
+    @classmethod
+    def from_stream(
+        cls, stream: BinaryIO, max_changes: Optional[int] = None
+    ) -> "DiffIndex":
+        """
+        Builds an index from the output of `git diff -z --numstat --patch`.
+
+        Binary files and files with more than `max_changes` changes are indexed from the
+        numstat records only; their patch text is skipped while streaming.
+
+        Args:
+            stream (BinaryIO): The stdout of the git diff process.
+            max_changes (int): Maximum # of changes for a patch to be loaded. None loads all.
+        """
+        index = cls()
+        numstat, rest = DiffIndex.read_numstat(stream)
+        for entry in DiffIndex.parse_numstat(numstat):
+            index.files[entry.path] = entry
+
+        def is_skipped(file: DiffFile) -> bool:
+            return max_changes is not None and (
+                file.binary or file.added + file.removed > max_changes
+            )
+
+        chunks = []
+        position = 0
+        current = None
+        # Lines of the patch being read before the file it belongs to is known
+        header = None
+        old_path = None
+
+        def append(line: bytes):
+            nonlocal position
+            text = line.decode(errors="replace")
+            if line.startswith(b"@@"):
+                current.hunks.append(position)
+            chunks.append(text)
+            position += len(text)
+
+        def start(path: Optional[str]):
+            # Patches are matched to numstat records by path, as not every record has
+            # a patch (e.g. unmerged paths)
+            nonlocal current, header
+            file = index.files.get(path) if path else None
+            lines = header
+            header = None
+            if file is None or file.loaded or is_skipped(file):
+                return
+            current = file
+            current.start = position
+            current.loaded = True
+            for line in lines:
+                append(line)
+
+        def finish():
+            nonlocal current
+            if header is not None:
+                start(DiffIndex.parse_git_header(header[0]))
+            if current:
+                current.end = position
+                current = None
+
+        for line in DiffIndex.iter_lines(rest, stream):
+            if line.startswith(b"diff --git "):
+                finish()
+                header = [line]
+                old_path = None
+                continue
+
+            if line.startswith(b"* Unmerged path "):
+                finish()
+                continue
+
+            if header is not None:
+                header.append(line)
+                if line.startswith((b"rename to ", b"copy to ")):
+                    start(unquote_path(line.split(b" ", 2)[2]))
+                elif line.startswith(b"--- "):
+                    path = unquote_path(line[4:])
+                    old_path = path[2:] if path.startswith("a/") else None
+                elif line.startswith(b"+++ "):
+                    path = unquote_path(line[4:])
+                    start(path[2:] if path.startswith("b/") else old_path)
+                elif line.startswith(b"Binary files "):
+                    start(DiffIndex.parse_git_header(header[0]))
+                continue
+
+            if current:
+                append(line)
+
+        finish()
+
+        # Files without a patch of their own, e.g. unmerged paths, have nothing to load
+        for file in index:
+            if not file.loaded and not is_skipped(file):
+                file.loaded = True
+                file.start = file.end = position
+
+        index.buffer = "".join(chunks)
+        return index
+
+    @staticmethod
+    def parse_git_header(line: bytes) -> Optional[str]:
+        """
+        Gets the new path from a `diff --git a/<old> b/<new>` header line.
+
+        Unquoted paths containing " b/" are ambiguous in the header, so the path is only
+        returned when both sides name the same file; other patches identify their file
+        with `rename to` or `+++` lines instead.
+        """
+        paths = line[len(b"diff --git ") :].rstrip(b"\n")
+        if paths.startswith(b'"'):
+            _, _, new = paths[1:].partition(b'" ')
+            return unquote_path(new)[2:] if new.startswith((b'"b/', b"b/")) else None
+
+        length = (len(paths) - 5) // 2
+        if paths == b"a/" + paths[2 : 2 + length] + b" b/" + paths[2 : 2 + length]:
+            return os.fsdecode(paths[2 : 2 + length])
+        return None
+
+    @staticmethod
+    def read_numstat(stream: BinaryIO) -> tuple[bytes, bytes]:
+        """
+        Reads the NUL-delimited numstat section, which is terminated by an empty record.
+
+        Returns:
+            A tuple of the numstat section and any patch output already read.
+        """
+        data = b""
+        while True:
+            if data.startswith(b"\0"):
+                return b"", data[1:]
+            if b"\0\0" in data:
+                numstat, rest = data.split(b"\0\0", 1)
+                return numstat + b"\0", rest
+
+            chunk = stream.read1(65536)
+            if not chunk:
+                return data, b""
+            data += chunk
+
+    @staticmethod
+    def parse_numstat(numstat: bytes) -> list[DiffFile]:
+        """
+        Parses `-z --numstat` records into diff files.
+
+        Records are "added\\tremoved\\tpath\\0", or "added\\tremoved\\t\\0old\\0new\\0" for renames.
+        Binary files report "-" for both counts.
+        """
+        entries = []
+        tokens = iter(numstat.split(b"\0"))
+        for token in tokens:
+            if not token:
+                continue
+            added, removed, path = token.split(b"\t", 2)
+            if path:
+                old_path = path
+            else:
+                old_path = next(tokens)
+                path = next(tokens)
+
+            binary = added == b"-"
+            entries.append(
+                DiffFile(
+                    path=os.fsdecode(path),
+                    old_path=os.fsdecode(old_path),
+                    added=0 if binary else int(added),
+                    removed=0 if binary else int(removed),
+                    binary=binary,
+                )
+            )
+        return entries
+
+    @staticmethod
+    def iter_lines(rest: bytes, stream: BinaryIO) -> Iterator[bytes]:
+        """
+        Yields the patch lines already read along with the remaining lines of the stream.
+        """
+        lines = rest.split(b"\n")
+        partial = lines.pop()
+        for line in lines:
+            yield line + b"\n"
+
+        for line in stream:
+            yield partial + line
+            partial = b""
+
+        if partial:
+            yield partial
+
+
+# C escapes used by git when quoting paths with unusual characters
+ESCAPES = {
+    ord("a"): 7,
+    ord("b"): 8,
+    ord("t"): 9,
+    ord("n"): 10,
+    ord("v"): 11,
+    ord("f"): 12,
+    ord("r"): 13,
+    ord('"'): 34,
+    ord("\\"): 92,
+}
+
+
+def unquote_path(path: bytes) -> str:
+    """
+    Decodes a path from a patch header line, which git quotes and escapes when it
+    contains unusual characters, e.g. "a/t\\303\\251st.txt".
+    """
+    path = path.rstrip(b"\n")
+    if not path.startswith(b'"'):
+        # Names containing spaces are followed by a tab in `---` and `+++` lines
+        return os.fsdecode(path.removesuffix(b"\t"))
+
+    unquoted = bytearray()
+    i = 1
+    while i < len(path) and path[i] != ord('"'):
+        if path[i] == ord("\\") and i + 1 < len(path):
+            if path[i + 1] in ESCAPES:
+                unquoted.append(ESCAPES[path[i + 1]])
+                i += 2
+                continue
+            if path[i + 1 : i + 4].isdigit():
+                unquoted.append(int(path[i + 1 : i + 4], 8))
+                i += 4
+                continue
+        unquoted.append(path[i])
+        i += 1
+    return os.fsdecode(bytes(unquoted))
@@ -0,0 +1,90 @@
+import os
+
+IGNORE_FILE = ".pushmateignore"
+
+# Compiled patterns keyed by ignore file path: (file signature, config value, patterns)
+compiled: dict[str, tuple[tuple[int, int], str, list[str]]] = {}
+
+
+def get_ignore_patterns(toplevel: str, defaults: str) -> list[str]:
+    """
+    Gets the ignore patterns of a repository as git glob pathspecs, relative to the root
+    of the working tree.
+
+    Patterns are read from the `.pushmateignore` file at the root of the working tree and
+    the comma-separated defaults from the configuration, and compiled once per process
+    until either changes.
+
+    Args:
+        toplevel (str): The root of the working tree.
+        defaults (str): Comma-separated gitignore-style patterns from the configuration.
+    """
+    path = os.path.join(toplevel, IGNORE_FILE)
+    try:
+        stat = os.stat(path)
+        signature = stat.st_mtime_ns, stat.st_size
+    except OSError:
+        signature = None
+
+    cached = compiled.get(path)
+    if cached and cached[0] == signature and cached[1] == defaults:
+        return cached[2]
+
+    lines = (defaults or "").split(",")
+    if signature:
+        with open(path, "r", errors="replace") as file:
+            lines += file.read().splitlines()
+
+    patterns = []
+    for line in lines:
+        for pattern in compile_pattern(line):
+            if pattern not in patterns:
+                patterns.append(pattern)
+
+    compiled[path] = signature, defaults, patterns
+    return patterns
+
+
+def compile_pattern(line: str) -> list[str]:
+    """
+    Translates one gitignore-style pattern into git glob pathspecs.
+
+    Patterns without a slash match at any depth, a leading slash anchors a pattern to the
+    root of the working tree and a trailing slash only matches directories. Negated
+    patterns (`!pattern`) cannot be expressed as pathspec exclusions and are skipped.
+
+    Returns:
+        The pathspecs matching the pattern, or an empty list for blank lines and comments.
+    """
+    pattern = line.strip()
+    if not pattern or pattern.startswith("#") or pattern.startswith("!"):
+        return []
+
+    directory = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    if not pattern:
+        return []
+
+    if pattern.startswith("/"):
+        pattern = pattern.lstrip("/")
+    elif "/" not in pattern and not pattern.startswith("**"):
+        pattern = f"**/{pattern}"
+
+    # A pattern matching a directory matches everything inside it
+    if directory:
+        return [f"{pattern}/**"]
+    return [pattern, f"{pattern}/**"]
+
+
+def exclude_pathspecs(patterns: list[str]) -> list[str]:
+    """
+    Builds the git pathspecs leaving out files matching the ignore patterns.
+    """
+    return [f":(top,glob,exclude){pattern}" for pattern in patterns]
+
+
+def include_pathspecs(patterns: list[str]) -> list[str]:
+    """
+    Builds the git pathspecs selecting only the files matching the ignore patterns.
+    """
+    return [f":(top,glob){pattern}" for pattern in patterns]
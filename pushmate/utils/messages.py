@@ -1,4 +1,5 @@
 from rich.console import Console
+from typing import Iterable
 
 console = Console()
 
@@ -25,3 +26,39 @@ def get_prompt(message: str):
 
 def get_status(message: str):
     return f"[yellow]{message}[/yellow] \n"
+
+
+def print_message(message: str):
+    """
+    Render a generated message.
+    """
+    from rich.markdown import Markdown
+
+    console.print(Markdown(f"```md\n{message}\n```"))
+
+
+def print_stream(chunks: Iterable[str], status: str) -> str:
+    """
+    Show a status spinner until the first chunk arrives, then render the text live as it streams.
+
+    Returns:
+        The full streamed text.
+    """
+    from rich.live import Live
+    from rich.markdown import Markdown
+
+    chunks = iter(chunks)
+    with console.status(status):
+        text = next(chunks, "")
+
+    if not text:
+        return ""
+
+    with Live(
+        Markdown(f"```md\n{text}\n```"), console=console, refresh_per_second=12
+    ) as live:
+        for chunk in chunks:
+            text += chunk
+            live.update(Markdown(f"```md\n{text}\n```"))
+
+    return text
@@ -0,0 +1,201 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+
+from pushmate import START_TIME
+
+
+class Span:
+    """
+    A timed stage of a command, e.g. one git invocation or one LLM request.
+    """
+
+    name: str
+    category: str
+    start: float
+    duration: float
+    thread: int
+    args: dict
+
+    def __init__(self, name: str, category: str, start: float, args: dict):
+        self.name = name
+        self.category = category
+        self.start = start
+        self.duration = 0.0
+        self.thread = threading.get_ident()
+        self.args = args
+
+
+class Profiler:
+    """
+    Records spans for the current process when enabled with `pm --profile`.
+
+    Recording is off by default, so instrumented code only pays for a flag check.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.spans: list[Span] = []
+        self.lock = threading.Lock()
+        # Runs are timed from the start of the process, so imports are included
+        self.origin = START_TIME
+        self.includes_imports = True
+
+    def enable(self):
+        self.enabled = True
+        self.spans = []
+
+    def restart(self):
+        """
+        Times the following run from now, e.g. a command served by the daemon, which
+        imported everything when it started.
+        """
+        self.origin = time.perf_counter()
+        self.includes_imports = False
+
+    def disable(self):
+        self.enabled = False
+
+    @contextmanager
+    def span(self, name: str, category: str = "", **args):
+        """
+        Times the enclosed block as a span.
+
+        Args:
+            name (str): The stage name shown in the timing table, e.g. "git diff".
+            category (str): The component the stage belongs to, e.g. "git" or "llm".
+            args: Extra details recorded in the trace.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        span = Span(name, category, time.perf_counter(), args)
+        try:
+            yield
+        finally:
+            span.duration = time.perf_counter() - span.start
+            with self.lock:
+                self.spans.append(span)
+
+    def summary(self) -> list[tuple[str, str, int, float, float]]:
+        """
+        Aggregates the spans by name, in order of first occurrence.
+
+        Returns:
+            A list of (name, category, calls, total seconds, max seconds) tuples.
+        """
+        stages = {}
+        with self.lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        for span in spans:
+            if span.name not in stages:
+                stages[span.name] = [span.category, 0, 0.0, 0.0]
+            stage = stages[span.name]
+            stage[1] += 1
+            stage[2] += span.duration
+            stage[3] = max(stage[3], span.duration)
+        return [(name, *stage) for name, stage in stages.items()]
+
+    def write_trace(self, path: str):
+        """
+        Writes the spans as a Chrome trace, viewable in chrome://tracing or Perfetto.
+        """
+        pid = os.getpid()
+        with self.lock:
+            events = [
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": (span.start - self.origin) * 1e6,
+                    "dur": span.duration * 1e6,
+                    "pid": pid,
+                    "tid": span.thread,
+                    "args": span.args,
+                }
+                for span in self.spans
+            ]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+# Profiler shared by every module in the process
+profiler = Profiler()
+
+
+def span(name: str, category: str = "", **args):
+    """
+    Times the enclosed block as a span of the shared profiler.
+    """
+    return profiler.span(name, category, **args)
+
+
+def timed(name: str, category: str = ""):
+    """
+    Decorator timing every call of a function as a span of the shared profiler.
+
+    Generator functions are timed from their first chunk being requested until they are
+    exhausted, so streamed responses are measured in full.
+    """
+
+    def decorator(function):
+        if inspect.isgeneratorfunction(function):
+
+            @functools.wraps(function)
+            def generator(*args, **kwargs):
+                with profiler.span(name, category):
+                    yield from function(*args, **kwargs)
+
+            return generator
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with profiler.span(name, category):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def print_profile():
+    """
+    Prints the time spent in each stage since profiling was enabled.
+    """
+    from rich.console import Console
+    from rich.table import Table
+
+    wall = time.perf_counter() - profiler.origin
+    table = Table(
+        "stage",
+        "category",
+        "calls",
+        "total ms",
+        "max ms",
+        "% of run",
+        title="timing breakdown",
+        caption=f"{wall * 1000:.0f} ms total, including "
+        + ("imports and " if profiler.includes_imports else "")
+        + "time spent waiting on prompts\n"
+        "stages run concurrently or nested in one another can overlap",
+    )
+    for name, category, calls, total, longest in profiler.summary():
+        table.add_row(
+            name,
+            category,
+            str(calls),
+            f"{total * 1000:.1f}",
+            f"{longest * 1000:.1f}",
+            f"{total / wall * 100:.0f}%" if wall else "",
+        )
+
+    console = Console()
+    console.rule(style="blue")
+    console.print(table)
+    console.rule(style="blue")
@@ -0,0 +1,240 @@
+import math
+import os
+import threading
+import time
+
+from pushmate.commands.config import APP_DIR
+
+STATS_PATH = os.path.join(APP_DIR, "stats.db")
+
+# Estimated USD price per million prompt and completion tokens of known models
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    time REAL NOT NULL,
+    command TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    latency REAL NOT NULL,
+    cache_hit INTEGER NOT NULL,
+    diff_size INTEGER NOT NULL
+)
+"""
+
+# Command being run, recorded with each call. Threads working on another repository,
+# e.g. in `pm commit --repos`, override it with `set_thread_context`.
+context = {"command": "", "repo": None, "diff_size": 0}
+thread_context = threading.local()
+
+
+def set_context(**values):
+    """
+    Sets the command, repository and/or diff size recorded with the following calls.
+    """
+    context.update(values)
+
+
+def set_thread_context(**values):
+    """
+    Sets the repository and/or diff size recorded with calls from the current thread.
+    """
+    for key, value in values.items():
+        setattr(thread_context, key, value)
+
+
+def get_context(key: str):
+    return getattr(thread_context, key, context[key])
+
+
+class CallStats:
+    """
+    Aggregated calls of one command or repository to one service.
+    """
+
+    group: str
+    kind: str
+    calls: int
+    cache_hits: int
+    p50: float
+    p95: float
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float
+
+
+class StatsStore:
+    """
+    Local SQLite store with one record per LLM and GitHub call.
+
+    Recording never interrupts a command: if the store cannot be written, the record is
+    dropped.
+    """
+
+    def __init__(self, path: str = STATS_PATH):
+        self.path = path
+        self.connection = None
+        self.lock = threading.Lock()
+
+    def connect(self):
+        if self.connection is None:
+            import sqlite3
+
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(SCHEMA)
+        return self.connection
+
+    def record(
+        self,
+        kind: str,
+        name: str,
+        latency: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cache_hit: bool = False,
+    ):
+        """
+        Appends a call to the store, with the command, repository and diff size of the
+        current context.
+
+        Args:
+            kind (str): The service called, "llm" or "github".
+            name (str): The model for LLM calls, or the method and path for GitHub calls.
+            latency (float): Seconds until the response was complete.
+        """
+        try:
+            repo = get_context("repo")
+            if repo is None:
+                repo = context["repo"] = get_repo()
+            with self.lock:
+                connection = self.connect()
+                connection.execute(
+                    "INSERT INTO calls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        time.time(),
+                        context["command"],
+                        repo,
+                        kind,
+                        name,
+                        prompt_tokens,
+                        completion_tokens,
+                        latency,
+                        int(cache_hit),
+                        get_context("diff_size"),
+                    ),
+                )
+                connection.commit()
+        except Exception:
+            # Stats are best effort
+            pass
+
+    def summarize(self, group: str, since: float = 0) -> list[CallStats]:
+        """
+        Aggregates the calls made since a point in time.
+
+        Args:
+            group (str): The column to group by, "command" or "repo".
+            since (float): Unix time of the oldest call to include.
+
+        Returns:
+            One entry per group and service, ordered by group. Latency percentiles only
+            include calls that were not answered from the cache.
+        """
+        if group not in ("command", "repo") or not os.path.exists(self.path):
+            return []
+
+        with self.lock:
+            rows = (
+                self.connect()
+                .execute(
+                    f"SELECT {group}, kind, name, prompt_tokens, completion_tokens, "
+                    "latency, cache_hit FROM calls WHERE time >= ? ORDER BY 1, 2",
+                    (since,),
+                )
+                .fetchall()
+            )
+
+        summaries = {}
+        latencies = {}
+        for key, kind, name, prompt_tokens, completion_tokens, latency, hit in rows:
+            if (key, kind) not in summaries:
+                stats = CallStats()
+                stats.group = key or "-"
+                stats.kind = kind
+                stats.calls = stats.cache_hits = 0
+                stats.prompt_tokens = stats.completion_tokens = 0
+                stats.cost = 0.0
+                summaries[(key, kind)] = stats
+                latencies[(key, kind)] = []
+
+            stats = summaries[(key, kind)]
+            stats.calls += 1
+            stats.cache_hits += hit
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cost += get_cost(name, prompt_tokens, completion_tokens)
+            if not hit:
+                latencies[(key, kind)].append(latency)
+
+        for key, stats in summaries.items():
+            stats.p50 = get_percentile(latencies[key], 0.5)
+            stats.p95 = get_percentile(latencies[key], 0.95)
+        return list(summaries.values())
+
+    def clear(self) -> int:
+        """
+        Removes every recorded call.
+
+        Returns:
+            The # of calls removed.
+        """
+        if not os.path.exists(self.path):
+            return 0
+        with self.lock:
+            connection = self.connect()
+            removed = connection.execute("DELETE FROM calls").rowcount
+            connection.commit()
+        return removed
+
+
+def get_repo() -> str:
+    """
+    Gets the working tree the command runs in, or an empty string outside a repository.
+    """
+    from pushmate.clients.git import get_backend
+
+    return get_backend().get_toplevel() or ""
+
+
+def get_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """
+    Estimates the USD cost of a call from the model's list price, 0 for unknown models.
+    """
+    prompt_price, completion_price = PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+
+def get_percentile(values: list[float], percentile: float) -> float:
+    """
+    Gets a percentile of the values with the nearest-rank method, or 0 if there are none.
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(math.ceil(percentile * len(values)) - 1, 0)]
+
+
+# Store shared by every client in the process
+stats_store = StatsStore()
@@ -0,0 +1,32 @@
+from functools import lru_cache
+
+# Rough characters per token for English text and code, used when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache
+def get_encoding(model: str):
+    """
+    Get the tiktoken encoding for a model, or None if tiktoken is not installed.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str) -> int:
+    """
+    Count the tokens in a text for the given model.
+
+    Uses tiktoken when it is installed, otherwise estimates from the text length.
+    """
+    encoding = get_encoding(model)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
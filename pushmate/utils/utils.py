@@ -1,3 +1,13 @@
+import re
+import threading
+import time
+
+from typing import Optional
+
+# Hidden marker in a pull request body recording the commit its description covers up to
+PR_MARKER = re.compile(r"\s*<!-- pushmate:([0-9a-f]{40,64}) -->\s*")
+
+
 def parse_pr(text):
     first_newline_index = text.find("\n")
 
@@ -8,3 +18,49 @@ def parse_pr(text):
     body = text[first_newline_index:].strip()
 
     return title, body
+
+
+def add_pr_marker(body: str, commit: str) -> str:
+    """
+    Appends the hidden marker of the commit a pull request description covers up to.
+    """
+    if not commit:
+        return body
+    return f"{body}\n\n<!-- pushmate:{commit} -->"
+
+
+def parse_pr_marker(body: str) -> tuple[str, Optional[str]]:
+    """
+    Splits the hidden marker off a pull request body.
+
+    Returns:
+        A tuple of the body without the marker and the commit it records, or None if the
+        body has no marker, e.g. for pull requests not created by PushMate. When the
+        body has several markers, e.g. copied from another description, the last one
+        is the one PushMate appended.
+    """
+    matches = list(PR_MARKER.finditer(body or ""))
+    if not matches:
+        return (body or "").strip(), None
+    return PR_MARKER.sub("\n\n", body).strip(), matches[-1].group(1)
+
+
+class Pacer:
+    """
+    Spaces out calls made from any number of threads by a minimum interval.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        """
+        Blocks until the next call is allowed.
+        """
+        with self.lock:
+            now = time.monotonic()
+            delay = max(0.0, self.next_time - now)
+            self.next_time = max(now, self.next_time) + self.interval
+        time.sleep(delay)
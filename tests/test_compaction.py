@@ -0,0 +1,179 @@
+import io
+
+from pushmate.utils.compaction import (
+    CompactFile,
+    collapse_moves,
+    collapse_whitespace,
+    compact_diff,
+    reduce_context,
+    summarize,
+)
+from pushmate.utils.diff import DiffIndex
+from pushmate.utils.tokens import count_tokens
+
+MODEL = "gpt-4o-mini"
+
+WHITESPACE = """\
+@@ -1,2 +1,2 @@
+-def add(a,b):
+-    return a+b
++def add(a, b):
++    return a + b
+"""
+
+REMOVED = """\
+@@ -1,5 +1,1 @@
+ import os
+-def helper(path):
+-    path = os.path.abspath(path)
+-    return os.path.basename(path)
+-
+"""
+
+ADDED = """\
+@@ -1,1 +1,4 @@
++def helper(path):
++    path = os.path.abspath(path)
++    return os.path.basename(path)
+ import sys
+"""
+
+CONTEXT = (
+    "@@ -1,9 +1,9 @@\n"
+    + "".join(f" context {i}\n" for i in range(4))
+    + "-old line\n+new line\n"
+    + "".join(f" context {i}\n" for i in range(4, 8))
+)
+
+
+def make_index(**hunks: str) -> DiffIndex:
+    """
+    Builds a diff index from one hunk per file, named after the keyword arguments.
+    """
+    numstat = b""
+    patch = b""
+    for name, hunk in hunks.items():
+        path = f"{name}.py"
+        lines = hunk.splitlines()[1:]
+        added = sum(line.startswith("+") for line in lines)
+        removed = sum(line.startswith("-") for line in lines)
+        numstat += f"{added}\t{removed}\t{path}\0".encode()
+        patch += (
+            f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n{hunk}"
+        ).encode()
+    stream = io.BufferedReader(io.BytesIO(numstat + b"\0" + patch))
+    return DiffIndex.from_stream(stream)
+
+
+def expect(index: DiffIndex, paths: list[str], **hunks: str) -> tuple[str, int]:
+    """
+    Builds the expected diff with some hunks replaced, and its token count as counted
+    by `compact_diff`, file by file.
+    """
+    diffs = [index.get_diff(path) for path in paths]
+    for old, new in hunks.values():
+        diffs = [diff.replace(old, new) for diff in diffs]
+    return "".join(diffs), sum(count_tokens(diff, MODEL) for diff in diffs)
+
+
+def test_collapse_whitespace():
+    assert collapse_whitespace(WHITESPACE) == (
+        "@@ -1,2 +1,2 @@ whitespace-only changes omitted\n"
+    )
+    assert collapse_whitespace(CONTEXT) == CONTEXT
+
+
+def test_collapse_moves():
+    index = make_index(removed=REMOVED, added=ADDED, context=CONTEXT)
+    files = [CompactFile(index, file) for file in index]
+
+    assert collapse_moves(files) == 2
+    assert files[0].hunks == ["@@ -1,5 +1,1 @@ 3 lines of moved code omitted\n"]
+    assert files[1].hunks == ["@@ -1,1 +1,4 @@ 3 lines of moved code omitted\n"]
+    assert files[2].hunks == [CONTEXT]
+
+
+def test_reduce_context():
+    assert reduce_context(CONTEXT) == (
+        "@@ -1,9 +1,9 @@\n context 3\n-old line\n+new line\n context 4\n"
+    )
+    assert reduce_context(CONTEXT, context=0) == (
+        "@@ -1,9 +1,9 @@\n-old line\n+new line\n"
+    )
+
+
+def test_summarize():
+    index = make_index(context=CONTEXT)
+    file = CompactFile(index, index.get("context.py"))
+    summarize(file)
+
+    assert file.hunks == []
+    assert file.text() == (
+        "diff --git a/context.py b/context.py\n"
+        "context.py: 1 additions, 1 deletions (diff omitted to fit token budget)\n"
+    )
+
+
+def test_compact_diff_fits():
+    index = make_index(whitespace=WHITESPACE, context=CONTEXT)
+    paths = ["whitespace.py", "context.py"]
+    diff, budget = expect(index, paths)
+
+    assert compact_diff(index, paths, budget, MODEL) == (diff, [])
+
+
+def test_compact_diff_stops_after_first_stage_that_fits():
+    index = make_index(whitespace=WHITESPACE, context=CONTEXT)
+    paths = ["whitespace.py", "context.py"]
+    collapsed, budget = expect(
+        index, paths, whitespace=(WHITESPACE, collapse_whitespace(WHITESPACE))
+    )
+
+    diff, notes = compact_diff(index, paths, budget, MODEL)
+
+    assert diff == collapsed
+    assert notes == ["collapsed 1 whitespace-only hunks"]
+
+
+def test_compact_diff_applies_stages_in_order():
+    index = make_index(removed=REMOVED, added=ADDED, context=CONTEXT)
+    paths = ["removed.py", "added.py", "context.py"]
+    reduced, budget = expect(
+        index,
+        paths,
+        removed=(REMOVED, "@@ -1,5 +1,1 @@ 3 lines of moved code omitted\n"),
+        added=(ADDED, "@@ -1,1 +1,4 @@ 3 lines of moved code omitted\n"),
+        context=(CONTEXT, reduce_context(CONTEXT)),
+    )
+
+    diff, notes = compact_diff(index, paths, budget, MODEL)
+
+    assert diff == reduced
+    assert notes == [
+        "collapsed 2 hunks of moved code",
+        "reduced context to 1 line around each change",
+    ]
+
+
+def test_compact_diff_summarizes_largest_files_last():
+    small = WHITESPACE.replace("add", "sub")
+    index = make_index(small=small, context=CONTEXT * 20)
+    paths = ["small.py", "context.py"]
+    summary = (
+        "diff --git a/context.py b/context.py\n"
+        "context.py: 20 additions, 20 deletions (diff omitted to fit token budget)\n"
+    )
+    collapsed, budget = expect(
+        index, ["small.py"], small=(small, collapse_whitespace(small))
+    )
+
+    diff, notes = compact_diff(
+        index, paths, budget + count_tokens(summary, MODEL), MODEL
+    )
+
+    assert diff == collapsed + summary
+    assert notes == [
+        "collapsed 1 whitespace-only hunks",
+        "reduced context to 1 line around each change",
+        "summarized 1 files: context.py",
+    ]
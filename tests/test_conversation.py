@@ -0,0 +1,58 @@
+from pushmate.commands.commit import get_commit_prompt
+from pushmate.utils.conversation import Conversation
+
+
+def test_first_turn_sends_prompt():
+    prompt = get_commit_prompt("full diff", 42)
+
+    assert Conversation(prompt, lambda: "condensed diff").messages() == prompt
+
+
+def test_refinement_keeps_instructions():
+    prompt = get_commit_prompt("full diff", 42)
+    conversation = Conversation(prompt, lambda: "condensed diff")
+    conversation.refine("Add caching", "Mention the cache size.")
+
+    messages = conversation.messages()
+
+    assert messages[:2] == prompt[:2]
+    assert "no more than 42 characters" in messages[1]["content"]
+    assert messages[2:] == [
+        {"role": "user", "content": "condensed diff"},
+        {"role": "assistant", "content": "Add caching"},
+        {"role": "user", "content": "Mention the cache size."},
+    ]
+    assert all("full diff" not in message["content"] for message in messages)
+
+
+def test_context_is_built_once_and_latest_turn_is_sent():
+    calls = []
+    conversation = Conversation(
+        get_commit_prompt("full diff", 42), lambda: calls.append(1) or "condensed"
+    )
+    conversation.refine("first", "shorter")
+    conversation.messages()
+    conversation.refine("second", "clearer")
+
+    messages = conversation.messages()
+
+    assert calls == [1]
+    assert "no more than 42 characters" in messages[1]["content"]
+    assert messages[-2:] == [
+        {"role": "assistant", "content": "second"},
+        {"role": "user", "content": "clearer"},
+    ]
+
+
+def test_refinement_without_context_sends_prompt():
+    prompt = [
+        {"role": "system", "content": "system"},
+        {"role": "user", "content": "title and body"},
+    ]
+    conversation = Conversation(prompt)
+    conversation.refine("issue", "more detail")
+
+    assert conversation.messages() == prompt + [
+        {"role": "assistant", "content": "issue"},
+        {"role": "user", "content": "more detail"},
+    ]
@@ -0,0 +1,69 @@
+import io
+import json
+import socket
+import threading
+import types
+
+import pytest
+
+from pushmate import daemon
+
+
+class Terminal(io.StringIO):
+    def isatty(self) -> bool:
+        return True
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """
+    Connects `forward` to a fake daemon, which answers with the given lines all at once.
+    """
+    client, conn = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    monkeypatch.setattr(daemon, "connect", lambda: client)
+    # Replaced as a whole, since pytest swaps sys.stdout back while capturing output
+    monkeypatch.setattr(
+        daemon, "sys", types.SimpleNamespace(stdin=Terminal(), stdout=Terminal())
+    )
+    monkeypatch.delenv("PUSHMATE_NO_DAEMON", raising=False)
+
+    requests = []
+
+    def serve(*responses: dict):
+        def run():
+            with conn:
+                data, fds, _, _ = socket.recv_fds(conn, 1 << 20, 3)
+                while not data.endswith(b"\n"):
+                    data += conn.recv(1 << 20)
+                for fd in fds:
+                    daemon.os.close(fd)
+                requests.append(json.loads(data))
+                conn.sendall(
+                    b"".join(json.dumps(r).encode() + b"\n" for r in responses)
+                )
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return requests
+
+    return serve
+
+
+def test_forward_reads_responses_received_together(server):
+    requests = server({"accepted": True}, {"exit_code": 0})
+
+    assert daemon.forward(["commit"]) == 0
+    assert requests[0]["argv"] == ["commit"]
+    assert requests[0]["env"] == dict(daemon.os.environ)
+
+
+def test_forward_exit_code(server):
+    server({"accepted": True}, {"exit_code": 3})
+
+    assert daemon.forward(["commit"]) == 3
+
+
+def test_forward_runs_in_process_when_busy(server):
+    server({"busy": True})
+
+    assert daemon.forward(["commit"]) is None
@@ -0,0 +1,175 @@
+import io
+import os
+import subprocess
+
+import pytest
+
+from pushmate.clients.git import GitClient, GitTarget
+from pushmate.utils.diff import DiffIndex, unquote_path
+
+
+def git(repo, *args: str, cwd: str = None) -> bytes:
+    return subprocess.run(
+        ["git", *args], cwd=cwd or repo, check=True, capture_output=True
+    ).stdout
+
+
+def write(repo, path: str, content):
+    path = os.path.join(repo, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    mode = "wb" if isinstance(content, bytes) else "w"
+    with open(path, mode) as file:
+        file.write(content)
+
+
+def diff_index(repo, *pathspecs: str, cwd: str = None, **kwargs) -> DiffIndex:
+    """
+    Indexes the staged changes the way `pm commit` does.
+    """
+    command = GitClient(GitTarget.COMMIT, path=repo, quiet=True).get_diff_command()
+    if pathspecs:
+        command += ["--", *pathspecs]
+    output = subprocess.run(
+        command, cwd=cwd or repo, check=True, capture_output=True
+    ).stdout
+    return DiffIndex.from_stream(io.BufferedReader(io.BytesIO(output)), **kwargs)
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    for role in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{role}_NAME", "test")
+        monkeypatch.setenv(f"GIT_{role}_EMAIL", "test@example.com")
+    monkeypatch.setenv("GIT_CONFIG_NOSYSTEM", "1")
+    monkeypatch.setenv("HOME", str(tmp_path))
+
+    repo = str(tmp_path / "repo")
+    os.makedirs(repo)
+    git(repo, "init", "-q")
+    write(repo, "moved.py", "".join(f"line {i}\n" for i in range(20)))
+    write(repo, "conflict.txt", "base\n")
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "initial")
+    return repo
+
+
+def test_parse_numstat():
+    files = DiffIndex.parse_numstat(
+        b"1\t2\tplain.py\0-\t-\timage.png\0" b"3\t0\t\0old name.py\0sub/new|name.py\0"
+    )
+
+    assert [(file.path, file.old_path) for file in files] == [
+        ("plain.py", "plain.py"),
+        ("image.png", "image.png"),
+        ("sub/new|name.py", "old name.py"),
+    ]
+    assert (files[0].added, files[0].removed, files[0].binary) == (1, 2, False)
+    assert files[1].binary and files[1].changes == "binary"
+    assert files[2].changes == "3"
+
+
+def test_unquote_path():
+    assert unquote_path(b'"b/t\\303\\251st \\"q\\".txt"\n') == 'b/tést "q".txt'
+    assert unquote_path(b"b/with space.txt\t\n") == "b/with space.txt"
+    assert unquote_path(b"b/a|b.txt") == "b/a|b.txt"
+
+
+def test_parse_git_header():
+    assert DiffIndex.parse_git_header(b"diff --git a/x b/y b/x b/y\n") == "x b/y"
+    assert (
+        DiffIndex.parse_git_header(b'diff --git "a/\\303\\251" "b/\\303\\251"') == "é"
+    )
+    # Renames cannot be split unambiguously and are identified by their `rename to` line
+    assert DiffIndex.parse_git_header(b"diff --git a/old b/new\n") is None
+
+
+def test_from_stream(repo):
+    write(repo, "a|b.txt", "pipe\n")
+    write(repo, "with space.txt", "space\n")
+    write(repo, "tést.txt", "unicode\n")
+    write(repo, "image.png", b"\x89PNG\0\0binary")
+    os.remove(os.path.join(repo, "moved.py"))
+    write(repo, "sub/moved.py", "".join(f"line {i}\n" for i in range(19)))
+    git(repo, "add", "-A")
+
+    index = diff_index(repo)
+
+    assert sorted(file.path for file in index) == [
+        "a|b.txt",
+        "image.png",
+        "sub/moved.py",
+        "tést.txt",
+        "with space.txt",
+    ]
+    assert "+pipe" in index.get_diff("a|b.txt")
+    assert "+space" in index.get_diff("with space.txt")
+    assert "+unicode" in index.get_diff("tést.txt")
+    assert "Binary files" in index.get_diff("image.png")
+
+    moved = index.get("sub/moved.py")
+    assert moved.old_path == "moved.py"
+    assert (moved.added, moved.removed) == (0, 1)
+    assert "rename to sub/moved.py" in index.get_diff("sub/moved.py")
+    assert "-line 19" in index.get_diff("sub/moved.py")
+    assert len(moved.hunks) == 1
+
+
+def test_from_stream_skips_large_and_binary_files(repo):
+    write(repo, "small.txt", "small\n")
+    write(repo, "large.txt", "".join(f"{i}\n" for i in range(50)))
+    write(repo, "image.png", b"\x89PNG\0\0binary")
+    git(repo, "add", "-A")
+
+    index = diff_index(repo, max_changes=10)
+
+    assert index.get("small.txt").loaded
+    assert not index.get("large.txt").loaded
+    assert not index.get("image.png").loaded
+    assert index.get("large.txt").changes == "50"
+    assert index.get_diff("large.txt") == ""
+    assert index.get_diffs(["small.txt", "large.txt"]) == index.get_diff("small.txt")
+
+
+def test_from_stream_unmerged_path(repo):
+    git(repo, "checkout", "-q", "-b", "other")
+    write(repo, "conflict.txt", "other\n")
+    git(repo, "commit", "-q", "-am", "other")
+    git(repo, "checkout", "-q", "-")
+    write(repo, "conflict.txt", "main\n")
+    git(repo, "commit", "-q", "-am", "main")
+    subprocess.run(["git", "merge", "-q", "other"], cwd=repo, capture_output=True)
+    write(repo, "after.txt", "after\n")
+    git(repo, "add", "after.txt")
+
+    index = diff_index(repo)
+
+    # The unmerged path has a numstat record but no patch of its own
+    assert index.get("conflict.txt").loaded
+    assert index.get_diff("conflict.txt") == ""
+    assert "+after" in index.get_diff("after.txt")
+    assert "conflict" not in index.get_diff("after.txt")
+
+
+def test_pathspecs_from_subdirectory(repo):
+    write(repo, "top.txt", "top\n")
+    write(repo, "sub/inner.txt", "inner\n")
+    write(repo, "sub/*.txt", "glob\n")
+    git(repo, "add", "-A")
+    index = diff_index(repo)
+    subdirectory = os.path.join(repo, "sub")
+
+    # Paths are relative to the root of the working tree, from wherever git runs
+    included = diff_index(
+        repo, *index.pathspecs(["top.txt", "sub/*.txt"]), cwd=subdirectory
+    )
+    assert sorted(file.path for file in included) == ["sub/*.txt", "top.txt"]
+    assert included.get_diff("top.txt") == index.get_diff("top.txt")
+
+    git(repo, "mv", "sub/inner.txt", "renamed.txt")
+    git(repo, "commit", "-q", "-m", "staged")
+    git(repo, "mv", "renamed.txt", "sub/inner.txt")
+    moved = diff_index(repo)
+    assert moved.pathspecs(["sub/inner.txt"]) == [
+        ":(top,literal)sub/inner.txt",
+        ":(top,literal)renamed.txt",
+    ]
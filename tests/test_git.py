@@ -0,0 +1,143 @@
+import os
+import subprocess
+
+import pytest
+
+from pushmate.clients.git import GitBackend, parse_git_config
+
+CONFIG = """\
+# comment
+; another comment
+[core]
+\trepositoryformatversion = 0
+\tbare = false
+\tFileMode=true
+\tignorecase
+[remote "origin"]
+\turl = git@github.com:Owner/Repo.git  # trailing comment
+\tfetch = +refs/heads/*:refs/remotes/origin/*
+[branch "Feature/X"]
+\tremote = origin
+\tmerge = refs/heads/Feature/X;comment
+[Extensions]
+\tobjectFormat = sha256
+[deprecated.Sub]
+\tkey = value
+\tempty =
+"""
+
+
+def git_config_list(path: str) -> dict[tuple[str, str, str], str]:
+    """
+    Parses a config file with git itself, keyed like `parse_git_config`.
+    """
+    output = subprocess.run(
+        ["git", "config", "--file", path, "--list", "-z"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    config = {}
+    for entry in output.split("\0"):
+        if not entry:
+            continue
+        key, _, value = entry.partition("\n")
+        section, _, rest = key.partition(".")
+        subsection, _, name = rest.rpartition(".")
+        config[(section, subsection, name)] = value if "\n" in entry else "true"
+    return config
+
+
+def test_parse_git_config(tmp_path):
+    path = str(tmp_path / "config")
+    with open(path, "w") as file:
+        file.write(CONFIG)
+
+    config = parse_git_config(path)
+
+    assert config == git_config_list(path)
+    assert config[("core", "", "filemode")] == "true"
+    assert config[("core", "", "ignorecase")] == "true"
+    assert config[("remote", "origin", "url")] == "git@github.com:Owner/Repo.git"
+    assert config[("branch", "Feature/X", "merge")] == "refs/heads/Feature/X"
+    assert config[("extensions", "", "objectformat")] == "sha256"
+    assert config[("deprecated", "sub", "key")] == "value"
+    assert config[("deprecated", "sub", "empty")] == ""
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "[include]\n\tpath = other.config\n",
+        '[includeIf "gitdir:~/work/"]\n\tpath = work.config\n',
+        '[alias]\n\tlg = "log --oneline"\n',
+        "[core]\n\teditor = vim \\\n\t\t-u NONE\n",
+        "not a config line\n",
+    ],
+)
+def test_parse_git_config_leaves_unsupported_syntax_to_git(tmp_path, content):
+    path = str(tmp_path / "config")
+    with open(path, "w") as file:
+        file.write(content)
+
+    assert parse_git_config(path) == {}
+
+
+def test_parse_git_config_missing_file(tmp_path):
+    assert parse_git_config(str(tmp_path / "missing")) == {}
+
+
+def git(repo: str, *args: str) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=repo, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    for role in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{role}_NAME", "test")
+        monkeypatch.setenv(f"GIT_{role}_EMAIL", "test@example.com")
+    monkeypatch.setenv("GIT_CONFIG_NOSYSTEM", "1")
+    monkeypatch.setenv("HOME", str(tmp_path))
+
+    repo = str(tmp_path / "repo")
+    os.makedirs(repo)
+    git(repo, "init", "-q", "-b", "main")
+    git(repo, "commit", "-q", "--allow-empty", "-m", "initial")
+    return repo
+
+
+def test_resolve_head_in_process(repo):
+    backend = GitBackend(repo)
+    head = git(repo, "rev-parse", "HEAD")
+
+    # Loose ref, then packed
+    assert backend.resolve("HEAD") == head
+    git(repo, "pack-refs", "--all")
+    assert not os.path.exists(os.path.join(repo, ".git", "refs", "heads", "main"))
+    assert backend.resolve("HEAD") == head
+    assert backend.resolve("refs/heads/main") == head
+
+    # Symbolic ref to a symbolic ref
+    git(repo, "symbolic-ref", "refs/heads/alias", "refs/heads/main")
+    git(repo, "symbolic-ref", "HEAD", "refs/heads/alias")
+    assert backend.resolve("HEAD") == head
+
+    git(repo, "checkout", "-q", "--detach", "main")
+    assert backend.resolve("HEAD") == head
+
+    git(repo, "checkout", "-q", "--orphan", "unborn")
+    assert backend.resolve("HEAD") is None
+    assert backend.resolve("refs/heads/missing") is None
+
+    # None of these needed the long-lived git process
+    assert backend.process is None
+
+
+def test_resolve_revision_with_git(repo):
+    backend = GitBackend(repo)
+
+    assert backend.resolve("main~0") == git(repo, "rev-parse", "main")
+    assert backend.resolve("missing") is None
+    backend.close()
@@ -0,0 +1,133 @@
+import time
+
+import pytest
+import requests
+
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from pushmate.clients.github import MAX_RETRY_DELAY, GitHubClient
+from pushmate.utils.stats import stats_store
+
+
+def response(status: int, **headers: str) -> requests.Response:
+    result = requests.Response()
+    result.status_code = status
+    result.headers.update(
+        {key.replace("_", "-"): value for key, value in headers.items()}
+    )
+    return result
+
+
+@pytest.mark.parametrize("status", [500, 502, 503])
+def test_post_server_error_is_not_retried(status):
+    assert GitHubClient.get_retry_delay(response(status), 0, "POST") is None
+
+
+@pytest.mark.parametrize("method", ["GET", "PATCH"])
+def test_server_error_backs_off(method):
+    assert GitHubClient.get_retry_delay(response(502), 0, method) == 1
+    assert GitHubClient.get_retry_delay(response(502), 2, method) == 4
+
+
+def test_client_error_is_not_retried():
+    assert GitHubClient.get_retry_delay(response(404), 0, "GET") is None
+    assert GitHubClient.get_retry_delay(response(422), 0, "POST") is None
+    # A 403 without rate limit headers is a permission error
+    assert GitHubClient.get_retry_delay(response(403), 0, "POST") is None
+
+
+@pytest.mark.parametrize(
+    "rate_limited",
+    [
+        response(429),
+        response(429, Retry_After="5"),
+        response(403, Retry_After="5"),
+        response(403, X_RateLimit_Remaining="0"),
+    ],
+)
+def test_rate_limited_post_is_retried(rate_limited):
+    assert GitHubClient.is_rate_limited(rate_limited)
+    delay = GitHubClient.get_retry_delay(rate_limited, 0, "POST")
+    assert delay is not None and 0 <= delay <= MAX_RETRY_DELAY
+
+
+def test_rate_limit_delay():
+    assert GitHubClient.get_retry_delay(response(429, Retry_After="5"), 0, "POST") == 5
+
+    reset = str(int(time.time()) + 10)
+    delay = GitHubClient.get_retry_delay(
+        response(403, X_RateLimit_Remaining="0", X_RateLimit_Reset=reset), 0, "POST"
+    )
+    assert 9 <= delay <= 11
+
+
+def test_rate_limit_wait_over_maximum_is_not_taken():
+    too_long = str(MAX_RETRY_DELAY + 1)
+    assert GitHubClient.get_retry_delay(response(429, Retry_After=too_long), 0) is None
+
+    reset = str(int(time.time()) + 3600)
+    assert (
+        GitHubClient.get_retry_delay(
+            response(403, X_RateLimit_Remaining="0", X_RateLimit_Reset=reset), 0
+        )
+        is None
+    )
+
+
+def test_unsent_requests():
+    assert GitHubClient.is_unsent(requests.ConnectTimeout())
+
+    refused = NewConnectionError(None, "connection refused")
+    error = requests.ConnectionError(MaxRetryError(None, "/", refused))
+    assert GitHubClient.is_unsent(error)
+
+    # The request may have reached GitHub before these failed
+    assert not GitHubClient.is_unsent(requests.ReadTimeout())
+    assert not GitHubClient.is_unsent(requests.ConnectionError("connection reset"))
+    assert not GitHubClient.is_unsent(requests.ConnectionError())
+
+
+class Session:
+    """
+    Stands in for `requests.Session`, raising each error in turn and then succeeding.
+    """
+
+    def __init__(self, *errors: Exception):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def request(self, *args, **kwargs) -> requests.Response:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return response(201)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda delay: None)
+    # Calls made by the tests are not recorded in the user's stats
+    monkeypatch.setattr(stats_store, "record", lambda *args, **kwargs: None)
+    return GitHubClient("token", (1.0, 1.0), 2)
+
+
+def test_post_is_retried_after_connect_timeout(client):
+    client.session = Session(requests.ConnectTimeout())
+
+    assert client.request("POST", "/repos/o/r/pulls", json={}).status_code == 201
+    assert client.session.calls == 2
+
+
+def test_post_is_not_retried_after_read_timeout(client):
+    client.session = Session(requests.ReadTimeout())
+
+    with pytest.raises(requests.ReadTimeout):
+        client.request("POST", "/repos/o/r/pulls", json={})
+    assert client.session.calls == 1
+
+
+def test_get_is_retried_after_read_timeout(client):
+    client.session = Session(requests.ReadTimeout())
+
+    assert client.request("GET", "/repos/o/r/pulls").status_code == 201
+    assert client.session.calls == 2
@@ -0,0 +1,98 @@
+import os
+import subprocess
+
+from pushmate.utils.ignore import (
+    IGNORE_FILE,
+    compile_pattern,
+    exclude_pathspecs,
+    get_ignore_patterns,
+    include_pathspecs,
+)
+
+
+def test_compile_pattern():
+    assert compile_pattern("package-lock.json") == [
+        "**/package-lock.json",
+        "**/package-lock.json/**",
+    ]
+    assert compile_pattern("/root.lock") == ["root.lock", "root.lock/**"]
+    assert compile_pattern("docs/*.md") == ["docs/*.md", "docs/*.md/**"]
+    assert compile_pattern("build/") == ["**/build/**"]
+    assert compile_pattern("/dist/") == ["dist/**"]
+    assert compile_pattern("**/generated") == ["**/generated", "**/generated/**"]
+    assert compile_pattern("  *.min.js  ") == ["**/*.min.js", "**/*.min.js/**"]
+
+
+def test_compile_pattern_skips_blank_comments_and_negations():
+    assert compile_pattern("") == []
+    assert compile_pattern("   ") == []
+    assert compile_pattern("# comment") == []
+    assert compile_pattern("!keep.lock") == []
+    assert compile_pattern("/") == []
+
+
+def test_pathspecs():
+    assert exclude_pathspecs(["**/*.lock"]) == [":(top,glob,exclude)**/*.lock"]
+    assert include_pathspecs(["**/*.lock"]) == [":(top,glob)**/*.lock"]
+
+
+def test_get_ignore_patterns(tmp_path):
+    toplevel = str(tmp_path)
+    assert get_ignore_patterns(toplevel, "a.lock, b.lock") == [
+        "**/a.lock",
+        "**/a.lock/**",
+        "**/b.lock",
+        "**/b.lock/**",
+    ]
+
+    with open(os.path.join(toplevel, IGNORE_FILE), "w") as file:
+        file.write("# generated code\nvendor/\na.lock\n")
+    assert get_ignore_patterns(toplevel, "a.lock") == [
+        "**/a.lock",
+        "**/a.lock/**",
+        "**/vendor/**",
+    ]
+
+    # Recompiled when the file changes
+    with open(os.path.join(toplevel, IGNORE_FILE), "w") as file:
+        file.write("/only\n")
+    assert get_ignore_patterns(toplevel, "") == ["only", "only/**"]
+
+
+def test_exclude_pathspecs_with_git(tmp_path):
+    repo = str(tmp_path)
+    paths = [
+        "package-lock.json",
+        "web/package-lock.json",
+        "vendor/lib/code.py",
+        "src/vendor.py",
+        "root.lock",
+        "sub/root.lock",
+        "sub/main.py",
+        "[literal].py",
+    ]
+    for path in paths:
+        os.makedirs(os.path.dirname(os.path.join(repo, path)), exist_ok=True)
+        with open(os.path.join(repo, path), "w") as file:
+            file.write("content\n")
+    subprocess.run(["git", "init", "-q"], cwd=repo, check=True)
+    subprocess.run(["git", "add", "-A"], cwd=repo, check=True)
+
+    patterns = []
+    for line in ["package-lock.json", "vendor/", "/root.lock"]:
+        patterns += compile_pattern(line)
+
+    # Patterns are relative to the root of the working tree, from wherever git runs
+    result = subprocess.run(
+        ["git", "diff", "--cached", "--name-only", "--"] + exclude_pathspecs(patterns),
+        cwd=os.path.join(repo, "sub"),
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert sorted(result.stdout.splitlines()) == [
+        "[literal].py",
+        "src/vendor.py",
+        "sub/main.py",
+        "sub/root.lock",
+    ]
@@ -0,0 +1,49 @@
+import pytest
+
+from pushmate.utils.utils import add_pr_marker, parse_pr, parse_pr_marker
+
+SHA1 = "0123456789abcdef0123456789abcdef01234567"
+SHA256 = "0123456789abcdef" * 4
+
+
+def test_parse_pr():
+    assert parse_pr("Title: Add caching \nBody line\n\nMore\n") == (
+        "Add caching",
+        "Body line\n\nMore",
+    )
+
+
+@pytest.mark.parametrize("commit", [SHA1, SHA256])
+def test_pr_marker_round_trip(commit):
+    body = add_pr_marker("## Summary\n\nAdds caching.\n", commit)
+
+    assert body.endswith(f"<!-- pushmate:{commit} -->")
+    assert parse_pr_marker(body) == ("## Summary\n\nAdds caching.", commit)
+
+
+def test_add_pr_marker_without_commit():
+    assert add_pr_marker("body", None) == "body"
+    assert add_pr_marker("body", "") == "body"
+
+
+def test_parse_pr_marker_without_marker():
+    assert parse_pr_marker("  written by hand\n") == ("written by hand", None)
+    assert parse_pr_marker("") == ("", None)
+    # GitHub returns a null body for pull requests without a description
+    assert parse_pr_marker(None) == ("", None)
+    assert parse_pr_marker("<!-- pushmate:not-a-commit -->") == (
+        "<!-- pushmate:not-a-commit -->",
+        None,
+    )
+
+
+def test_parse_pr_marker_edited_body():
+    body = f"Intro\n<!-- pushmate:{SHA1} -->\nA note added below the marker"
+
+    assert parse_pr_marker(body) == ("Intro\n\nA note added below the marker", SHA1)
+
+
+def test_parse_pr_marker_uses_last_marker():
+    body = add_pr_marker(f"Quoted <!-- pushmate:{SHA1} --> marker", SHA256)
+
+    assert parse_pr_marker(body) == ("Quoted\n\nmarker", SHA256)